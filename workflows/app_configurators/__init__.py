@@ -1,16 +1,25 @@
 """
 Application-specific configurators for post-deployment steps.
 Each configurator handles the specific setup for different application types.
+
+Configurator classes are imported lazily (PEP 562) so a deployment only pays
+for the modules it actually uses.
 """
 
+import importlib
+
 from .base_configurator import BaseConfigurator
-from .apache_configurator import ApacheConfigurator
-from .nginx_configurator import NginxConfigurator
-from .php_configurator import PhpConfigurator
-from .python_configurator import PythonConfigurator
-from .nodejs_configurator import NodeJSConfigurator
-from .docker_configurator import DockerConfigurator
-from .database_configurator import DatabaseConfigurator
+
+# Public name -> submodule that defines it
+_LAZY = {
+    'ApacheConfigurator': '.apache_configurator',
+    'NginxConfigurator': '.nginx_configurator',
+    'PhpConfigurator': '.php_configurator',
+    'PythonConfigurator': '.python_configurator',
+    'NodeJSConfigurator': '.nodejs_configurator',
+    'DockerConfigurator': '.docker_configurator',
+    'DatabaseConfigurator': '.database_configurator',
+}
 
 __all__ = [
     'BaseConfigurator',
@@ -22,3 +31,17 @@ __all__ = [
     'DockerConfigurator',
     'DatabaseConfigurator',
 ]
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_LAZY[name], __name__)
+    value = getattr(module, name)
+    # Cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
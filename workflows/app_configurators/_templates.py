@@ -0,0 +1,692 @@
+"""
+Shell script templates used by the application configurators.
+
+Templates are module-level constants so they are built once at import time;
+configurators only substitute the per-deployment values. Script bodies use
+str.format placeholders (literal bash braces are doubled), while the default
+index page uses string.Template so its CSS does not need escaping.
+"""
+
+import base64
+from string import Template
+
+
+# Shared by the apt and yum scripts; only the log directory differs
+APACHE_VHOST = '''<VirtualHost *:80>
+    DocumentRoot {document_root}
+
+    <Directory {document_root}>
+        Options Indexes FollowSymLinks
+        AllowOverride All
+        Require all granted
+    </Directory>
+
+    # Enable rewrite engine for pretty URLs
+    RewriteEngine On
+
+    # Security headers
+    Header always set X-Content-Type-Options nosniff
+    Header always set X-Frame-Options DENY
+    Header always set X-XSS-Protection "1; mode=block"
+
+    ErrorLog /var/log/{log_dir}/app_error.log
+    CustomLog /var/log/{log_dir}/app_access.log combined
+</VirtualHost>'''
+
+APACHE_APT_SCRIPT = '''
+set -e
+echo "Configuring Apache for application on Ubuntu/Debian..."
+
+# Create virtual host configuration
+cat > /tmp/app.conf << 'EOF'
+{vhost}
+EOF
+
+# Install the configuration, enable modules and fix permissions in one privileged shell
+sudo bash -s << 'ROOT_EOF'
+set -e
+mv /tmp/app.conf /etc/apache2/sites-available/app.conf
+a2ensite app.conf
+a2dissite 000-default.conf || true
+
+# Enable required modules
+a2enmod rewrite headers
+
+# Ensure proper permissions
+chown -R {web_user}:{web_group} {document_root}
+chmod -R 755 {document_root}
+ROOT_EOF
+
+echo "✅ Apache configured for application on Ubuntu/Debian"
+'''
+
+APACHE_YUM_SCRIPT = '''
+set -e
+echo "Configuring Apache for application on Amazon Linux/RHEL/CentOS..."
+
+# Create virtual host configuration
+cat > /tmp/app.conf << 'EOF'
+{vhost}
+EOF
+
+# Install the configuration and fix permissions in one privileged shell
+sudo bash -s << 'ROOT_EOF'
+set -e
+mv /tmp/app.conf /etc/httpd/conf.d/app.conf
+chown -R {web_user}:{web_group} {document_root}
+chmod -R 755 {document_root}
+ROOT_EOF
+
+# Create a simple index.html if none exists
+if [ ! -f {document_root}/index.html ] && [ ! -f {document_root}/index.php ]; then
+    cat > /tmp/index.html << 'EOF'
+{default_index}
+EOF
+    sudo install -m 644 -o {web_user} -g {web_group} /tmp/index.html {document_root}/index.html
+    rm -f /tmp/index.html
+    echo "✅ Created default index.html"
+fi
+
+# Restart Apache to apply configuration
+sudo systemctl restart httpd
+
+echo "✅ Apache configured for application on Amazon Linux/RHEL/CentOS"
+'''
+
+APACHE_DEFAULT_INDEX = Template('''<!DOCTYPE html>
+<html>
+<head>
+    <title>Application Deployed Successfully</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; }
+        .success { color: #28a745; }
+        .info { background: #f8f9fa; padding: 20px; border-radius: 5px; }
+    </style>
+</head>
+<body>
+    <h1 class="success">✅ Application Deployed Successfully!</h1>
+    <div class="info">
+        <p><strong>Server:</strong> Apache on Amazon Linux</p>
+        <p><strong>Document Root:</strong> $document_root</p>
+        <p><strong>Status:</strong> Web server is running and accessible</p>
+    </div>
+    <p>Your application has been deployed successfully. You can now upload your application files to $document_root.</p>
+</body>
+</html>''')
+
+# Nginx reverse proxy site scripts have no placeholders and are used as-is
+NGINX_NODEJS_PROXY_SCRIPT = '''
+set -e
+echo "Configuring Nginx as reverse proxy for Node.js application..."
+
+# Create server block configuration for Node.js proxy
+cat > /tmp/app << 'EOF'
+# Reuse connections to the app instead of opening one per request
+upstream nodejs_app {
+    server 127.0.0.1:3000;
+    keepalive 64;
+}
+
+# WebSocket upgrades get 'upgrade'; everything else keeps the upstream connection alive
+map $http_upgrade $nodejs_app_connection {
+    default upgrade;
+    ''      '';
+}
+
+server {
+    listen 80;
+    server_name _;
+    
+    location / {
+        proxy_pass http://nodejs_app;
+        proxy_http_version 1.1;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection $nodejs_app_connection;
+        proxy_set_header Host $host;
+        proxy_set_header X-Real-IP $remote_addr;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto $scheme;
+        proxy_cache_bypass $http_upgrade;
+        
+        # Buffer upstream responses so slow clients don't hold the app
+        proxy_buffering on;
+        proxy_buffer_size 16k;
+        proxy_buffers 8 16k;
+    }
+    
+    # Security headers
+    add_header X-Content-Type-Options nosniff;
+    add_header X-Frame-Options DENY;
+    add_header X-XSS-Protection "1; mode=block";
+}
+EOF
+
+# Install the configuration (one privileged shell instead of a sudo per command).
+# sites-enabled/* is what Nginx includes, so the file goes there directly;
+# install replaces any old sites-available symlink. Reload only if the config tests clean.
+sudo bash -s << 'ROOT_EOF'
+set -e
+install -m 0644 -o root -g root /tmp/app /etc/nginx/sites-enabled/app
+rm -f /tmp/app /etc/nginx/sites-enabled/default
+nginx -t
+systemctl reload-or-restart nginx
+ROOT_EOF
+
+echo "✅ Nginx configured as reverse proxy for Node.js"
+'''
+
+NGINX_PYTHON_PROXY_SCRIPT = '''
+set -e
+echo "Configuring Nginx as reverse proxy for Python application..."
+
+# Create server block configuration for Python proxy
+cat > /tmp/app << 'EOF'
+# Reuse connections to the app instead of opening one per request
+upstream python_app {
+    server 127.0.0.1:5000;
+    keepalive 64;
+}
+
+server {
+    listen 80;
+    server_name _;
+    
+    location / {
+        proxy_pass http://python_app;
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        proxy_set_header Host $host;
+        proxy_set_header X-Real-IP $remote_addr;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto $scheme;
+        
+        # Buffer upstream responses so slow clients don't hold a worker
+        proxy_buffering on;
+        proxy_buffer_size 16k;
+        proxy_buffers 8 16k;
+        
+        # Timeouts
+        proxy_connect_timeout 60s;
+        proxy_send_timeout 60s;
+        proxy_read_timeout 60s;
+    }
+    
+    # Health check endpoint
+    location /health {
+        proxy_pass http://python_app/health;
+        proxy_http_version 1.1;
+        proxy_set_header Connection "";
+        access_log off;
+    }
+    
+    # Security headers
+    add_header X-Content-Type-Options nosniff;
+    add_header X-Frame-Options DENY;
+    add_header X-XSS-Protection "1; mode=block";
+}
+EOF
+
+# Install the configuration (one privileged shell instead of a sudo per command).
+# sites-enabled/* is what Nginx includes, so the file goes there directly;
+# install replaces any old sites-available symlink. Reload only if the config tests clean.
+sudo bash -s << 'ROOT_EOF'
+set -e
+install -m 0644 -o root -g root /tmp/app /etc/nginx/sites-enabled/app
+rm -f /tmp/app /etc/nginx/sites-enabled/default
+nginx -t
+systemctl reload-or-restart nginx
+ROOT_EOF
+
+echo "✅ Nginx configured as reverse proxy for Python"
+'''
+
+NGINX_STATIC_OR_PHP_SCRIPT = '''
+set -e
+echo "Configuring Nginx for application..."
+
+# Check if this is a React/SPA application
+if [ -f "{document_root}/index.html" ] && [ ! -f "{document_root}/index.php" ]; then
+    echo "Detected React/SPA application"
+    cat > /tmp/app << 'EOF'
+server {{
+    listen 80;
+    server_name _;
+    
+    root {document_root};
+    index index.html;
+    
+    # Serve files straight from the kernel and keep open fds/metadata cached
+    sendfile on;
+    tcp_nopush on;
+    tcp_nodelay on;
+    keepalive_timeout 65;
+    open_file_cache max=10000 inactive=60s;
+    open_file_cache_valid 30s;
+    open_file_cache_min_uses 2;
+    open_file_cache_errors on;
+    
+    location / {{
+        try_files $uri $uri/ /index.html;
+    }}
+    
+    # Cache static assets
+    location ~* \\.(js|css|png|jpg|jpeg|gif|ico|svg|woff|woff2|ttf|eot)$ {{
+        expires 1y;
+        add_header Cache-Control "public, immutable";
+        access_log off;
+    }}
+    
+    # Security headers
+    add_header X-Content-Type-Options nosniff;
+    add_header X-Frame-Options DENY;
+    add_header X-XSS-Protection "1; mode=block";
+}}
+EOF
+else
+    echo "Detected PHP/traditional web application"
+    cat > /tmp/app << 'EOF'
+# Keep FastCGI connections to PHP-FPM open between requests. Each idle
+# connection pins an FPM worker, so stay well under the default
+# pm.max_children (5) per Nginx worker.
+upstream php_fpm {{
+    # OS-agnostic PHP-FPM socket path
+    server unix:/var/run/php/php8.1-fpm.sock;
+    keepalive 2;
+}}
+
+server {{
+    listen 80;
+    server_name _;
+    
+    root {document_root};
+    index index.php index.html index.htm;
+    
+    location / {{
+        try_files $uri $uri/ /index.php?$query_string;
+    }}
+    
+    location ~ \\.php$ {{
+        include snippets/fastcgi-php.conf;
+        fastcgi_pass php_fpm;
+        fastcgi_keep_conn on;
+        # Large enough for typical pages so responses don't spill to temp files
+        fastcgi_buffer_size 32k;
+        fastcgi_buffers 16 16k;
+    }}
+    
+    location ~ /\\.ht {{
+        deny all;
+    }}
+    
+    # Security headers
+    add_header X-Content-Type-Options nosniff;
+    add_header X-Frame-Options DENY;
+    add_header X-XSS-Protection "1; mode=block";
+}}
+EOF
+fi
+
+# Install the configuration (one privileged shell instead of a sudo per command).
+# sites-enabled/* is what Nginx includes, so the file goes there directly;
+# install replaces any old sites-available symlink. Reload only if the config tests clean.
+sudo bash -s << 'ROOT_EOF'
+set -e
+install -m 0644 -o root -g root /tmp/app /etc/nginx/sites-enabled/app
+rm -f /tmp/app /etc/nginx/sites-enabled/default
+nginx -t
+systemctl reload-or-restart nginx
+ROOT_EOF
+
+echo "✅ Nginx configured for application"
+'''
+
+NGINX_OWNERSHIP_SCRIPT = '''
+set -e
+echo "Fixing directory ownership for Nginx..."
+
+# Check if nginx user exists
+if id "{nginx_user}" &>/dev/null; then
+    echo "✅ Nginx user '{nginx_user}' exists"
+    
+    # Set ownership and permissions for web directories in one privileged shell
+    echo "Setting ownership of {document_root} to {nginx_user}:{nginx_group}"
+    sudo bash -s << 'ROOT_EOF'
+set -e
+chown -R {nginx_user}:{nginx_group} {document_root}
+chmod -R 755 {document_root}
+chmod -R 777 {document_root}/tmp 2>/dev/null || true
+chmod -R 755 {document_root}/logs 2>/dev/null || true
+ROOT_EOF
+    
+    echo "✅ Directory ownership fixed for Nginx"
+else
+    echo "⚠️  Nginx user '{nginx_user}' does not exist yet, keeping system user ownership"
+    echo "   This is normal if Nginx hasn't been fully configured yet"
+fi
+'''
+
+
+RDS_SCRIPT = '''
+set -e
+echo "Setting up RDS database connection..."
+
+# Install MySQL client
+{pkg_update}
+{pkg_install} {mysql_client_pkg}
+
+# Create fallback environment file
+if [ ! -f /var/www/html/.env ]; then
+    echo "Creating fallback local database environment file..."
+    printf '%s' '{env_b64}' | base64 -d | sudo tee /var/www/html/.env > /dev/null
+
+    sudo chown {web_user}:{web_group} /var/www/html/.env
+    sudo chmod 644 /var/www/html/.env
+    echo "✅ Fallback environment file created"
+fi
+
+echo "✅ RDS configuration completed (with local fallback)"
+'''
+
+DOCKER_DEPLOY_SCRIPT = '''
+set -e
+echo "🐳 Setting up Docker deployment..."
+
+# Set Docker image tag if provided
+export DOCKER_IMAGE_TAG="{docker_image_tag}"
+
+# Deployment directory (the package was streamed and extracted here already)
+DEPLOY_DIR="{deploy_dir}"
+cd $DEPLOY_DIR
+
+# Find docker-compose file
+# Check the usual top-level names first; only walk the tree if they are missing
+COMPOSE_FILE=""
+for candidate in docker-compose.yml docker-compose.yaml; do
+    if [ -f "$candidate" ]; then
+        COMPOSE_FILE="$candidate"
+        break
+    fi
+done
+if [ -z "$COMPOSE_FILE" ]; then
+    COMPOSE_FILE=$(find . -name "docker-compose.yml" -o -name "docker-compose.yaml" | head -n 1)
+fi
+
+if [ -z "$COMPOSE_FILE" ]; then
+    echo "❌ No docker-compose.yml found in package"
+    exit 1
+fi
+
+echo "✅ Found docker-compose file: $COMPOSE_FILE"
+
+# Create .env file if environment variables provided
+if [ -n "{env_file_content}" ]; then
+    sudo tee .env > /dev/null << 'ENVEOF'
+{env_file_content}
+ENVEOF
+    echo "✅ Environment file created"
+fi
+
+# Ensure Docker is available
+DOCKER_BIN=""
+if [ -f /usr/bin/docker ]; then
+    DOCKER_BIN="/usr/bin/docker"
+elif command -v docker > /dev/null 2>&1; then
+    DOCKER_BIN=$(command -v docker)
+else
+    echo "⚠️  Docker not found, attempting to install..."
+    curl -fsSL https://get.docker.com -o /tmp/get-docker.sh
+    sudo sh /tmp/get-docker.sh
+    sudo systemctl start docker
+    sudo systemctl enable docker
+
+    if [ -f /usr/bin/docker ]; then
+        DOCKER_BIN="/usr/bin/docker"
+    elif command -v docker > /dev/null 2>&1; then
+        DOCKER_BIN=$(command -v docker)
+    else
+        echo "❌ Docker installation failed"
+        exit 1
+    fi
+    echo "✅ Docker installed successfully"
+fi
+
+echo "✅ Docker found at $DOCKER_BIN"
+
+# Add default user to docker group
+sudo usermod -aG docker {default_user} || true
+
+# Stop existing containers
+echo "🛑 Stopping existing containers..."
+sudo $DOCKER_BIN compose -f $COMPOSE_FILE down --timeout 30 || true
+
+# Pull the pre-built image, or refresh the service images (and build locally)
+UP_FLAGS="-d"
+if [ -n "$DOCKER_IMAGE_TAG" ]; then
+    echo "📦 Using pre-built image: $DOCKER_IMAGE_TAG"
+    export DOCKER_IMAGE="$DOCKER_IMAGE_TAG"
+
+    # Pull service images in the background
+    timeout 600 sudo $DOCKER_BIN compose -f $COMPOSE_FILE pull db redis phpmyadmin > /dev/null 2>&1 &
+    SERVICE_PULL_PID=$!
+
+    # The image is normally pulled (with retries) before this script runs;
+    # pull once here only if it is still missing, e.g. Docker was just installed
+    if ! sudo $DOCKER_BIN image inspect "$DOCKER_IMAGE_TAG" > /dev/null 2>&1; then
+        echo "📥 Pulling pre-built Docker image..."
+        if ! timeout 600 sudo $DOCKER_BIN pull "$DOCKER_IMAGE_TAG"; then
+            echo "❌ Failed to pull image"
+            exit 1
+        fi
+    fi
+
+    # Wait for the background service image pull
+    wait $SERVICE_PULL_PID || true
+else
+    # Refresh tagged service images (e.g. :latest); buildable services have nothing to pull
+    timeout 600 sudo $DOCKER_BIN compose -f $COMPOSE_FILE pull --ignore-pull-failures || true
+
+    if grep -q "build:" $COMPOSE_FILE; then
+        echo "🔨 Building Docker image on instance..."
+        # --pull refreshes the base images, so `up` below only starts containers
+        timeout 900 sudo $DOCKER_BIN compose -f $COMPOSE_FILE build --pull || {{
+            echo "❌ Build failed"
+            exit 1
+        }}
+    fi
+fi
+
+# Start containers, blocking until they are running/healthy instead of sleeping
+# (older Compose releases have no --wait; they fall back to a plain up -d)
+echo "🚀 Starting containers..."
+if sudo $DOCKER_BIN compose up --help 2>/dev/null | grep -q -- --wait; then
+    UP_FLAGS="$UP_FLAGS --wait --wait-timeout 120"
+else
+    echo "ℹ️  compose up --wait is unsupported, starting without it"
+fi
+if ! timeout 300 sudo $DOCKER_BIN compose -f $COMPOSE_FILE up $UP_FLAGS; then
+    echo "❌ Failed to start containers"
+    sudo $DOCKER_BIN compose -f $COMPOSE_FILE ps -a
+    sudo $DOCKER_BIN compose -f $COMPOSE_FILE logs --tail=100
+    exit 1
+fi
+
+# Test web service connectivity, polling for at most 100 seconds
+echo "🔍 Testing web service..."
+WEB_READY=false
+WEB_DEADLINE=$((SECONDS + 100))
+i=0
+while [ $SECONDS -lt $WEB_DEADLINE ]; do
+    i=$((i + 1))
+    if curl -f -s --connect-timeout 5 --max-time 10 http://localhost/ > /dev/null 2>&1; then
+        echo "✅ Web service is responding"
+        WEB_READY=true
+        break
+    fi
+    [ $((i % 10)) -eq 0 ] && echo "Waiting for web service... ($((WEB_DEADLINE - SECONDS))s left)"
+    sleep 0.5
+done
+
+if [ "$WEB_READY" = "false" ]; then
+    echo "⚠️  Web service not responding after 100 seconds"
+    sudo $DOCKER_BIN compose -f $COMPOSE_FILE ps
+    sudo $DOCKER_BIN compose -f $COMPOSE_FILE logs --tail=50
+fi
+
+echo "✅ Docker deployment completed"
+'''
+
+MYSQL_LOCAL_SCRIPT = '''
+set -e
+echo "Setting up local MySQL database..."
+
+# Install MySQL if not present
+if ! command -v mysql &> /dev/null; then
+    echo "Installing MySQL server..."
+    {pkg_install} mysql-server
+fi
+
+# Start and enable MySQL
+{svc_start} {mysql_service}
+{svc_enable} {mysql_service}
+
+# Configure MySQL root user
+echo "Configuring MySQL root user..."
+sudo mysql -e "ALTER USER 'root'@'localhost' IDENTIFIED WITH mysql_native_password BY 'root123';" 2>/dev/null || echo "Root password configuration attempted"
+
+# Create application database
+mysql -u root -proot123 -e "CREATE DATABASE IF NOT EXISTS app_db;" 2>/dev/null && echo "✅ app_db database created" || echo "❌ Failed to create database"
+
+# Create test table with sample data
+mysql -u root -proot123 app_db -e "
+CREATE TABLE IF NOT EXISTS test_table (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT IGNORE INTO test_table (id, name) VALUES 
+    (1, 'Test Entry'),
+    (2, 'Sample Data'),
+    (3, 'Database Working');
+" 2>/dev/null && echo "✅ Test table created with sample data" || echo "❌ Failed to create test table"
+
+# Test connection
+mysql -u root -proot123 -e "SELECT COUNT(*) as record_count FROM test_table;" app_db 2>/dev/null && echo "✅ MySQL connection test successful" || echo "❌ MySQL connection test failed"
+
+# Create environment file
+printf '%s' '{env_b64}' | base64 -d | sudo tee /var/www/html/.env > /dev/null
+
+# Set proper permissions
+sudo chown {web_user}:{web_group} /var/www/html/.env
+sudo chmod 644 /var/www/html/.env
+
+echo "✅ Local MySQL database setup completed"
+'''
+
+POSTGRESQL_LOCAL_SCRIPT = '''
+set -e
+echo "Setting up local PostgreSQL database..."
+
+# Install PostgreSQL
+{pkg_update}
+{pkg_install} {pg_packages}
+
+# Start and enable PostgreSQL
+{svc_start} postgresql
+{svc_enable} postgresql
+
+# Create application database and user
+sudo -u postgres psql -c "CREATE DATABASE app_db;" 2>/dev/null || echo "Database may already exist"
+sudo -u postgres psql -c "CREATE USER app_user WITH PASSWORD 'app_password';" 2>/dev/null || echo "User may already exist"
+sudo -u postgres psql -c "GRANT ALL PRIVILEGES ON DATABASE app_db TO app_user;" 2>/dev/null || echo "Privileges granted"
+
+# Create environment file
+printf '%s' '{env_b64}' | base64 -d | sudo tee /var/www/html/.env > /dev/null
+
+# Set proper permissions
+sudo chown {web_user}:{web_group} /var/www/html/.env
+sudo chmod 644 /var/www/html/.env
+
+echo "✅ Local PostgreSQL database setup completed"
+'''
+
+# Single pull attempt for the pre-built image; DockerConfigurator retries with backoff
+DOCKER_PULL_SCRIPT = '''
+set -e
+DOCKER_IMAGE_TAG="{docker_image_tag}"
+DOCKER_BIN=$(command -v docker || true)
+if [ -z "$DOCKER_BIN" ]; then
+    echo "ℹ️  Docker not installed yet, the image will be pulled during deployment"
+    exit 0
+fi
+
+# Skip the registry round trip if this exact image was already pulled.
+# Only trusted for pinned tags: ':latest' or untagged may have moved.
+PULL_MARKER="/var/lib/app-deploy/pulled.$(echo "$DOCKER_IMAGE_TAG" | sha256sum | cut -d' ' -f1)"
+LOCAL_IMAGE_ID=$(sudo $DOCKER_BIN image inspect --format '{{{{.Id}}}}' "$DOCKER_IMAGE_TAG" 2>/dev/null || true)
+IMAGE_REF="${{DOCKER_IMAGE_TAG##*/}}"
+if [ -n "$LOCAL_IMAGE_ID" ] && [ -f "$PULL_MARKER" ] && [ "$(cat $PULL_MARKER)" = "$LOCAL_IMAGE_ID" ] \\
+    && [[ "$IMAGE_REF" == *:* ]] && [[ "$IMAGE_REF" != *:latest ]]; then
+    echo "✅ Image $DOCKER_IMAGE_TAG already pulled, skipping registry pull"
+    exit 0
+fi
+
+timeout 600 sudo $DOCKER_BIN pull "$DOCKER_IMAGE_TAG"
+sudo mkdir -p /var/lib/app-deploy
+sudo $DOCKER_BIN image inspect --format '{{{{.Id}}}}' "$DOCKER_IMAGE_TAG" | sudo tee "$PULL_MARKER" > /dev/null
+echo "✅ Image pulled successfully"
+'''
+
+# .env bodies written by the database scripts, base64-encoded once at import
+# so each script writes the file with a single printf instead of a heredoc
+ENV_FILES = {
+    'rds_fallback': '''# Database Configuration - Fallback to Local MySQL
+DB_EXTERNAL=false
+DB_TYPE=MYSQL
+DB_HOST=localhost
+DB_PORT=3306
+DB_NAME=app_db
+DB_USERNAME=root
+DB_PASSWORD=root123
+DB_CHARSET=utf8mb4
+
+# Application Configuration
+APP_ENV=production
+APP_DEBUG=false
+APP_NAME="Generic Application"
+''',
+    'mysql_local': '''# Database Configuration - Local MySQL
+DB_EXTERNAL=false
+DB_TYPE=MYSQL
+DB_HOST=localhost
+DB_PORT=3306
+DB_NAME=app_db
+DB_USERNAME=root
+DB_PASSWORD=root123
+DB_CHARSET=utf8mb4
+
+# Application Configuration
+APP_ENV=production
+APP_DEBUG=false
+APP_NAME="Generic Application"
+''',
+    'postgresql_local': '''# Database Configuration - Local PostgreSQL
+DB_EXTERNAL=false
+DB_TYPE=POSTGRESQL
+DB_HOST=localhost
+DB_PORT=5432
+DB_NAME=app_db
+DB_USERNAME=app_user
+DB_PASSWORD=app_password
+DB_CHARSET=utf8
+
+# Application Configuration
+APP_ENV=production
+APP_DEBUG=false
+APP_NAME="Generic Application"
+''',
+}
+
+ENV_FILES_B64 = {
+    name: base64.b64encode(body.encode('utf-8')).decode('ascii')
+    for name, body in ENV_FILES.items()
+}
@@ -2,9 +2,39 @@
 Base configurator class for application-specific configurations.
 """
 
+import functools
+import hashlib
+from os_detector import OSDetector
+
+@functools.lru_cache(maxsize=8)
+def _os_profile(os_type, package_manager, service_manager):
+    """
+    Resolve (and cache) the OS lookups shared by every configurator of a client
+    
+    Returns:
+        Tuple of (user_info, pkg_commands, svc_commands); treat as read-only
+    """
+    return (
+        OSDetector.get_user_info(os_type),
+        OSDetector.get_package_manager_commands(package_manager),
+        OSDetector.get_service_commands(service_manager),
+    )
+
+# Remote directory holding one <name>.sha256 file per configurator with the
+# hash of the script it last applied successfully
+CONFIGURED_MARKER_DIR = '/var/lib/app-deploy'
+
+
 class BaseConfigurator:
     """Base class for all application configurators"""
     
+    # Names (get_name()) of configurators that must finish before this one starts
+    depends_on = ()
+    
+    # Skip the script on the instance when an identical one already succeeded there.
+    # Only safe for pure system configuration, not for scripts that (re)deploy app code.
+    skip_if_unchanged = False
+    
     def __init__(self, client, config):
         """
         Initialize configurator
@@ -15,16 +45,99 @@ class BaseConfigurator:
         """
         self.client = client
         self.config = config
+        
+        # Resolve OS-specific details once; subclasses read these attributes
+        self.os_type = getattr(client, 'os_type', 'ubuntu')
+        self.os_info = getattr(client, 'os_info', None) or {'package_manager': 'apt', 'user': 'ubuntu'}
+        self.user_info, self.pkg_commands, self.svc_commands = _os_profile(
+            self.os_type,
+            self.os_info.get('package_manager', 'apt'),
+            self.os_info.get('service_manager', 'systemd'),
+        )
+    
+    # Timeout (seconds) for this configurator's script, also used to size batches
+    script_timeout = 120
+    
+    def build_script(self):
+        """
+        Build the bash fragment for this configurator without running it.
+        
+        Configurators that return a script can be batched into a single SSH
+        session by ConfiguratorFactory.run_all(). Returning None means the
+        configurator has to run on its own via configure() (e.g. it needs a
+        fallback path, live output or a file upload).
+        
+        Returns:
+            str or None: Bash script fragment, or None if not batchable
+        """
+        return None
+    
+    def prepare_script(self):
+        """
+        Build the script to send to the instance.
+        
+        For configurators with skip_if_unchanged, the script is keyed by the
+        SHA-256 of its content plus the OS type and guarded on the instance,
+        so it's skipped if that exact script is the one last applied there.
+        
+        Returns:
+            str or None: Bash script, or None if not batchable
+        """
+        script = self.build_script()
+        if script is None or not self.skip_if_unchanged:
+            return script
+        
+        digest = hashlib.sha256(f"{self.os_type}\n{script}".encode('utf-8')).hexdigest()
+        marker = f"{CONFIGURED_MARKER_DIR}/{self.get_name()}.sha256"
+        
+        # The marker is dropped before running, so a partial run never
+        # leaves an older digest behind that could match a later deploy
+        return f'''
+if [ "$(sudo cat {marker} 2>/dev/null)" = "{digest}" ]; then
+    echo "ℹ️  {self.get_name()} configuration unchanged, skipping"
+    exit 0
+fi
+sudo rm -f {marker}
+(
+{script}
+)
+STATUS=$?
+if [ $STATUS -eq 0 ]; then
+    sudo mkdir -p {CONFIGURED_MARKER_DIR}
+    echo "{digest}" | sudo tee {marker} > /dev/null
+fi
+exit $STATUS
+'''
     
     def configure(self) -> bool:
         """
         Configure the application/service.
-        Must be implemented by subclasses.
+        Subclasses either implement build_script() or override this method.
         
         Returns:
             bool: True if configuration succeeded, False otherwise
         """
-        raise NotImplementedError("Subclasses must implement configure()")
+        script = self.prepare_script()
+        if script is None:
+            raise NotImplementedError("Subclasses must implement build_script() or configure()")
+        
+        return self._run_batched(script)
+    
+    def _run_batched(self, *fragments, timeout=None) -> bool:
+        """
+        Run several script fragments in a single SSH session.
+        
+        Args:
+            *fragments: Bash script fragments, run in order
+            timeout: Command timeout in seconds (defaults to script_timeout)
+            
+        Returns:
+            bool: True if the combined script succeeded, False otherwise
+        """
+        script = '\n'.join(fragments)
+        success, output = self.client.run_command(script, timeout=timeout or self.script_timeout)
+        print(output)
+        return success
     
     def get_name(self) -> str:
         """Get the name of this configurator"""
@@ -1,16 +1,34 @@
 """Factory for creating application configurators"""
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import List
-from .apache_configurator import ApacheConfigurator
-from .nginx_configurator import NginxConfigurator
-from .php_configurator import PhpConfigurator
-from .python_configurator import PythonConfigurator
-from .nodejs_configurator import NodeJSConfigurator
-from .docker_configurator import DockerConfigurator
-from .database_configurator import DatabaseConfigurator
+
+
+def _configurator_class(name):
+    """Resolve a configurator class through the package's lazy loader"""
+    return getattr(importlib.import_module(__package__), name)
+
 
 class ConfiguratorFactory:
     """Factory for creating the appropriate configurators based on installed dependencies"""
     
+    # (installed dependencies that trigger it, configurator class, config flags that also trigger it)
+    _DISPATCH = (
+        # Web server configurators
+        (frozenset({'apache'}), 'ApacheConfigurator', ()),
+        (frozenset({'nginx'}), 'NginxConfigurator', ()),
+        # Language/runtime configurators
+        (frozenset({'php'}), 'PhpConfigurator', ()),
+        (frozenset({'python'}), 'PythonConfigurator', ()),
+        (frozenset({'nodejs'}), 'NodeJSConfigurator', ()),
+        # Database configurator (handles MySQL, PostgreSQL, RDS)
+        (frozenset({'mysql', 'postgresql'}), 'DatabaseConfigurator',
+         ('dependencies.mysql.enabled', 'dependencies.postgresql.enabled')),
+        # Docker configurator
+        (frozenset({'docker'}), 'DockerConfigurator', ()),
+    )
+    
     @staticmethod
     def create_configurators(client, config, installed_dependencies: List[str]):
         """
@@ -24,39 +42,169 @@ class ConfiguratorFactory:
         Returns:
             List of configurator instances
         """
+        deps = frozenset(installed_dependencies)
         configurators = []
         
-        # Web server configurators
-        if 'apache' in installed_dependencies:
-            configurators.append(ApacheConfigurator(client, config))
+        for triggers, class_name, config_flags in ConfiguratorFactory._DISPATCH:
+            if deps & triggers or any(config.get(flag, False) for flag in config_flags):
+                configurators.append(_configurator_class(class_name)(client, config))
         
-        if 'nginx' in installed_dependencies:
-            configurators.append(NginxConfigurator(client, config))
+        return configurators
+    
+    @staticmethod
+    def run_all(client, configurators) -> bool:
+        """
+        Run configurators, batching their scripts into a single SSH session
         
-        # Language/runtime configurators
-        if 'php' in installed_dependencies:
-            configurators.append(PhpConfigurator(client, config))
+        Scripts from prepare_script() are concatenated into one remote script.
+        Each fragment runs in its own background subshell so its `set -e` only
+        aborts that fragment, and independent fragments run concurrently on
+        the instance. Configurators without a script (fallback paths, live
+        output, uploads) run via configure().
         
-        if 'python' in installed_dependencies:
-            configurators.append(PythonConfigurator(client, config))
+        The batch and the standalone configurators are independent SSH
+        sessions, so they run concurrently in waves ordered by each
+        configurator's depends_on.
         
-        if 'nodejs' in installed_dependencies:
-            configurators.append(NodeJSConfigurator(client, config))
+        Args:
+            client: LightsailBase client instance
+            configurators: List of configurator instances
+            
+        Returns:
+            bool: True if every configurator succeeded, False otherwise
+        """
+        success = True
+        batched = []
+        jobs = []
         
-        # Database configurator (handles MySQL, PostgreSQL, RDS)
-        mysql_enabled = config.get('dependencies.mysql.enabled', False)
-        postgresql_enabled = config.get('dependencies.postgresql.enabled', False)
+        for configurator in configurators:
+            configurator_name = configurator.__class__.__name__
+            try:
+                script = configurator.prepare_script()
+            except Exception as e:
+                print(f"❌ {configurator_name} failed with error: {str(e)}")
+                success = False
+                continue
+            
+            if script is None:
+                jobs.append(({configurator.get_name()}, set(configurator.depends_on),
+                             partial(ConfiguratorFactory._run_standalone, configurator)))
+            else:
+                batched.append((configurator, script))
         
-        if mysql_enabled or postgresql_enabled or 'mysql' in installed_dependencies or 'postgresql' in installed_dependencies:
-            configurators.append(DatabaseConfigurator(client, config))
+        if batched:
+            jobs.insert(0, ({c.get_name() for c, _ in batched},
+                            {dep for c, _ in batched for dep in c.depends_on},
+                            partial(ConfiguratorFactory._run_batch, client, batched)))
         
-        # Docker configurator
-        if 'docker' in installed_dependencies:
-            configurators.append(DockerConfigurator(client, config))
+        for wave in ConfiguratorFactory._schedule_waves(jobs):
+            if len(wave) == 1:
+                results = [wave[0]()]
+            else:
+                with ThreadPoolExecutor(max_workers=len(wave)) as executor:
+                    results = list(executor.map(lambda job: job(), wave))
+            success = all(results) and success
         
-        return configurators
+        return success
+    
+    @staticmethod
+    def _schedule_waves(jobs):
+        """
+        Group jobs into waves so each job runs after the jobs it depends on
+        
+        Args:
+            jobs: List of (names, depends_on, payload) tuples
+            
+        Returns:
+            List of waves, each a list of job payloads that can run concurrently
+        """
+        waves = []
+        pending = list(jobs)
+        while pending:
+            pending_names = {name for names, _, _ in pending for name in names}
+            ready = [job for job in pending if not (job[1] - job[0]) & pending_names]
+            if not ready:
+                # Dependency cycle: run whatever is left one at a time
+                waves.extend([run] for _, _, run in pending)
+                break
+            waves.append([run for _, _, run in ready])
+            pending = [job for job in pending if job not in ready]
+        return waves
+    
+    @staticmethod
+    def _run_batch(client, batched) -> bool:
+        """
+        Run prepared (configurator, script) pairs in a single SSH session
+        
+        Fragments in the same wave (see depends_on) run concurrently on the
+        instance as background subshells; each one's output goes to its own
+        log file that is printed in order once the wave finishes.
+        """
+        print(f"\n🔧 Running {', '.join(c.__class__.__name__ for c, _ in batched)} in a single session...")
+        
+        waves = ConfiguratorFactory._schedule_waves(
+            [({c.get_name()}, set(c.depends_on), (index, c, script))
+             for index, (c, script) in enumerate(batched)]
+        )
+        
+        fragments = ['FAILED=""', 'LOG_DIR=$(mktemp -d)']
+        for wave in waves:
+            for index, configurator, script in wave:
+                fragments.append(f'''
+echo "🔧 Running {configurator.__class__.__name__}..."
+(
+{script}
+) > "$LOG_DIR/{index}.log" 2>&1 &
+PID_{index}=$!
+''')
+            for index, configurator, _ in wave:
+                configurator_name = configurator.__class__.__name__
+                fragments.append(f'''
+wait $PID_{index}
+STATUS=$?
+cat "$LOG_DIR/{index}.log"
+if [ $STATUS -eq 0 ]; then
+    echo "✅ {configurator_name} completed successfully"
+else
+    echo "CONFIGURATOR_FAILED: {configurator_name}" >&2
+    FAILED="$FAILED {configurator_name}"
+fi
+''')
+        fragments.append('rm -rf "$LOG_DIR"')
+        fragments.append('[ -z "$FAILED" ] || exit 1')
+        
+        # Waves run one after another; within a wave the slowest fragment bounds the time
+        timeout = sum(max(c.script_timeout for _, c, _ in wave) for wave in waves)
+        success, output = client.run_command('\n'.join(fragments), timeout=timeout)
+        
+        if not success:
+            failed = [line.split(':', 1)[1].strip() for line in output.splitlines()
+                      if line.startswith('CONFIGURATOR_FAILED:')]
+            if not failed:
+                # The session itself failed (timeout, SSH error), so nothing is known to be done
+                failed = [c.__class__.__name__ for c, _ in batched]
+            for configurator_name in failed:
+                print(f"⚠️  {configurator_name} reported issues")
+        
+        return success
+    
+    @staticmethod
+    def _run_standalone(configurator) -> bool:
+        """Run a configurator that manages its own SSH calls"""
+        configurator_name = configurator.__class__.__name__
+        print(f"\n🔧 Running {configurator_name}...")
+        
+        try:
+            if not configurator.configure():
+                print(f"⚠️  {configurator_name} reported issues")
+                return False
+            print(f"✅ {configurator_name} completed successfully")
+            return True
+        except Exception as e:
+            print(f"❌ {configurator_name} failed with error: {str(e)}")
+            return False
     
     @staticmethod
     def get_docker_configurator(client, config):
         """Get Docker configurator specifically for Docker deployments"""
-        return DockerConfigurator(client, config)
+        return _configurator_class('DockerConfigurator')(client, config)
@@ -4,16 +4,16 @@ from .base_configurator import BaseConfigurator
 class NodeJSConfigurator(BaseConfigurator):
     """Handles Node.js application configuration"""
     
-    def configure(self) -> bool:
-        """Configure Node.js application with systemd service (OS-agnostic)"""
+    script_timeout = 420
+    
+    def build_script(self) -> str:
+        """Build the Node.js systemd service script (OS-agnostic)"""
         print("🔧 Configuring Node.js application...")
         
-        # Get OS information from config if available
-        os_type = getattr(self.config, 'os_type', 'ubuntu')
-        os_info = getattr(self.config, 'os_info', {'user': 'ubuntu'})
-        default_user = os_info.get('user', 'ubuntu')
+        os_type = self.os_type
+        default_user = self.os_info.get('user', self.user_info['default_user'])
         
-        script = f'''
+        return f'''
 set -e
 echo "Configuring Node.js for application on {os_type}..."
 
@@ -37,7 +37,27 @@ fi
 # Install dependencies if package.json exists
 if [ -f "/opt/nodejs-app/package.json" ]; then
     echo "📦 Installing Node.js dependencies..."
-    cd /opt/nodejs-app && sudo -u {default_user} npm install --production 2>&1 | tee /tmp/npm-install.log
+    # Report npm's exit status through the tee
+    set -o pipefail
+    cd /opt/nodejs-app
+    NPM_FLAGS="--prefer-offline --no-audit --no-fund"
+    # With a lockfile, npm ci skips dependency resolution; --prefer-offline reuses
+    # the user's ~/.npm cache, which survives redeploys on the instance.
+    # npm ci rejects a lockfile out of sync with package.json; npm install copes.
+    NPM_DONE=false
+    if [ -f package-lock.json ]; then
+        if sudo -u {default_user} npm ci --omit=dev $NPM_FLAGS 2>&1 | tee /tmp/npm-install.log; then
+            NPM_DONE=true
+        else
+            echo "⚠️  npm ci failed, falling back to npm install..."
+        fi
+    fi
+    if [ "$NPM_DONE" = "false" ]; then
+        if ! sudo -u {default_user} npm install --production $NPM_FLAGS 2>&1 | tee -a /tmp/npm-install.log; then
+            echo "❌ Failed to install Node.js dependencies (see /tmp/npm-install.log)"
+            exit 1
+        fi
+    fi
     echo "✅ Dependencies installed"
 else
     echo "ℹ️  No package.json found, skipping dependency installation"
@@ -82,20 +102,27 @@ sudo systemctl stop nodejs-app.service 2>/dev/null || true
 echo "🚀 Starting Node.js application service..."
 sudo systemctl start nodejs-app.service
 
-# Wait and check if service started successfully
-sleep 5
+# Wait for the app to start listening (polls for up to ~10s instead of a fixed sleep)
+wait_for_port() {{
+    for i in $(seq 1 40); do
+        LISTEN=$(sudo ss -tlnp 2>/dev/null || sudo netstat -tlnp 2>/dev/null)
+        [[ "$LISTEN" == *":$1"* ]] && return 0
+        sleep 0.25
+    done
+    return 1
+}}
+wait_for_port 3000 || true
 
 if systemctl is-active --quiet nodejs-app.service; then
     echo "✅ Node.js app service started successfully"
     sudo systemctl status nodejs-app.service --no-pager
     
-    # Check if app is listening on port 3000
-    sleep 2
-    if sudo ss -tlnp 2>/dev/null | grep -q ":3000" || sudo netstat -tlnp 2>/dev/null | grep -q ":3000"; then
+    # Check if app is listening on port 3000 (socket listing from wait_for_port)
+    if [[ "$LISTEN" == *":3000"* ]]; then
         echo "✅ Application is listening on port 3000"
     else
         echo "⚠️  Application may not be listening on port 3000"
-        sudo ss -tlnp 2>/dev/null | grep node || sudo netstat -tlnp 2>/dev/null | grep node || echo "No node process found listening"
+        grep node <<< "$LISTEN" || echo "No node process found listening"
     fi
     
     # Test local connection
@@ -116,7 +143,3 @@ fi
 
 echo "✅ Node.js application configured successfully on {os_type}"
 '''
-        
-        success, output = self.client.run_command(script, timeout=420)
-        print(output)
-        return success
@@ -1,23 +1,18 @@
 """Python application configurator"""
 
 from .base_configurator import BaseConfigurator
-from os_detector import OSDetector
 
 
 class PythonConfigurator(BaseConfigurator):
     """Configure Python for the application"""
     
-    def configure(self) -> bool:
-        """Configure Python for the application"""
-        # Get OS information from client
-        os_type = getattr(self.client, 'os_type', 'ubuntu')
-        os_info = getattr(self.client, 'os_info', {'package_manager': 'apt', 'user': 'ubuntu'})
-        
-        # Get OS-specific information
-        self.user_info = OSDetector.get_user_info(os_type)
-        self.pkg_commands = OSDetector.get_package_manager_commands(os_info['package_manager'])
-        self.svc_commands = OSDetector.get_service_commands(os_info.get('service_manager', 'systemd'))
-        
+    script_timeout = 120
+    
+    # The WSGI setup only installs mod_wsgi once Apache is up
+    depends_on = ('Apache',)
+    
+    def build_script(self) -> str:
+        """Build the Python configuration script for the application"""
         app_type = self.config.get('application.type', 'web')
         
         if app_type == 'api':
@@ -25,7 +20,7 @@ class PythonConfigurator(BaseConfigurator):
         else:
             return self._configure_wsgi_app()
     
-    def _configure_api_app(self) -> bool:
+    def _configure_api_app(self) -> str:
         """Configure Python API application with systemd service"""
         print("🔧 Configuring Python API application...")
         
@@ -55,14 +50,16 @@ if [ -f "{document_root}/requirements.txt" ]; then
         {self.pkg_commands['install']} python3-pip
     fi
     
-    # Install dependencies
-    sudo pip3 install -r requirements.txt 2>&1 | tee /tmp/pip-install.log
+    # Install dependencies, preferring wheels and keeping them cached for redeploys
+    sudo mkdir -p /var/cache/pip
+    PIP_INSTALL="sudo PIP_CACHE_DIR=/var/cache/pip pip3 install --prefer-binary --no-input --disable-pip-version-check"
+    $PIP_INSTALL -r requirements.txt 2>&1 | tee /tmp/pip-install.log
     echo "✅ Dependencies installed"
     
     # Ensure Gunicorn is installed (fallback)
     if ! command -v gunicorn &> /dev/null; then
         echo "📦 Installing Gunicorn as fallback..."
-        sudo pip3 install gunicorn
+        $PIP_INSTALL gunicorn
     fi
 else
     echo "ℹ️  No requirements.txt found, skipping dependency installation"
@@ -109,20 +106,27 @@ sudo systemctl stop python-app.service 2>/dev/null || true
 echo "🚀 Starting Python application service..."
 sudo systemctl start python-app.service
 
-# Wait and check if service started successfully
-sleep 5
+# Wait for the app to start listening (polls for up to ~10s instead of a fixed sleep)
+wait_for_port() {{
+    for i in $(seq 1 40); do
+        LISTEN=$(sudo ss -tlnp 2>/dev/null || sudo netstat -tlnp 2>/dev/null)
+        [[ "$LISTEN" == *":$1"* ]] && return 0
+        sleep 0.25
+    done
+    return 1
+}}
+wait_for_port 5000 || true
 
 if systemctl is-active --quiet python-app.service; then
     echo "✅ Python app service started successfully"
     sudo systemctl status python-app.service --no-pager
     
-    # Check if app is listening on port 5000
-    sleep 2
-    if sudo ss -tlnp 2>/dev/null | grep -q ":5000" || sudo netstat -tlnp 2>/dev/null | grep -q ":5000"; then
+    # Check if app is listening on port 5000 (socket listing from wait_for_port)
+    if [[ "$LISTEN" == *":5000"* ]]; then
         echo "✅ Application is listening on port 5000"
     else
         echo "⚠️  Application may not be listening on port 5000"
-        sudo ss -tlnp 2>/dev/null | grep python || sudo netstat -tlnp 2>/dev/null | grep python || echo "No python process found listening"
+        grep python <<< "$LISTEN" || echo "No python process found listening"
     fi
     
     # Test local connection
@@ -144,32 +148,29 @@ fi
 echo "✅ Python app service configured"
 '''
         
-        success, output = self.client.run_command(script, timeout=120)
-        print(output)
-        return success
+        return script
     
-    def _configure_wsgi_app(self) -> bool:
+    def _configure_wsgi_app(self) -> str:
         """Configure Python WSGI application with Apache"""
         print("🔧 Configuring Python WSGI application...")
         
-        script = '''
+        if self.os_info.get('package_manager', 'apt') == 'apt':
+            apache_service = 'apache2'
+            wsgi_install = f"{self.pkg_commands['install']} libapache2-mod-wsgi-py3\n    sudo a2enmod wsgi"
+        else:
+            apache_service = 'httpd'
+            wsgi_install = f"{self.pkg_commands['install']} python3-mod_wsgi"
+        
+        script = f'''
 set -e
 echo "Configuring Python for web application..."
 
 # Install mod_wsgi if Apache is present
-apache_service=$(if [ "{self.user_info.get('web_user', 'www-data')}" = "www-data" ]; then echo "apache2"; else echo "httpd"; fi)
-if {self.svc_commands['is_active']} $apache_service; then
+if {self.svc_commands['is_active']} {apache_service}; then
     {self.pkg_commands['update']}
-    if [ "{self.pkg_commands['install']}" = *"apt-get"* ]; then
-        {self.pkg_commands['install']} libapache2-mod-wsgi-py3
-        sudo a2enmod wsgi
-    else
-        {self.pkg_commands['install']} python3-mod_wsgi
-    fi
+    {wsgi_install}
     echo "✅ mod_wsgi configured for Apache"
 fi
 '''
         
-        success, output = self.client.run_command(script, timeout=120)
-        print(output)
-        return success
+        return script
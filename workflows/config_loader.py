@@ -4,14 +4,32 @@ Configuration loader for deployment workflows
 This module provides utilities to load and access configuration from YAML files
 """
 
+import hashlib
+import marshal
+import mmap
 import os
 import sys
+import tempfile
 import yaml
 from typing import Dict, Any, Optional, List
 
+# libyaml's C parser when PyYAML was built with it, pure Python otherwise
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+def _cache_dir() -> str:
+    """Per-user directory for parsed configs; never inside the repository checkout"""
+    base = (os.environ.get('RUNNER_TEMP') or os.environ.get('XDG_CACHE_HOME')
+            or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'deployment-config')
+
 class DeploymentConfig:
     """Configuration loader and accessor for deployment workflows"""
     
+    __slots__ = ('config_file', 'config', '_parsed')
+    
     def __init__(self, config_file: str = 'deployment.config.yml'):
         """
         Initialize configuration loader
@@ -20,6 +38,7 @@ class DeploymentConfig:
             config_file: Path to the configuration YAML file
         """
         self.config_file = config_file
+        self._parsed = None
         self.config = self._load_config()
     
     def _load_config(self) -> Dict[str, Any]:
@@ -31,24 +50,67 @@ class DeploymentConfig:
             os.path.join(os.getcwd(), self.config_file)
         ]
         
+        # One stat per candidate; its size also tells us whether the file can be mapped
         config_path = None
         for path in possible_paths:
-            if os.path.exists(path):
-                config_path = path
-                break
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            config_path = path
+            break
         
         if not config_path:
             raise FileNotFoundError(f"Configuration file not found. Searched: {possible_paths}")
         
         try:
-            with open(config_path, 'r') as file:
-                config = yaml.safe_load(file)
-                print(f"✅ Configuration loaded from: {config_path}")
-                return config
+            with open(config_path, 'rb') as file:
+                # Hash and parse straight from a read-only mapping (mmap rejects empty files)
+                if stat.st_size:
+                    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        config = self._load_mapped(config_path, mapped)
+                else:
+                    config = self._load_mapped(config_path, b'')
         except yaml.YAMLError as e:
             raise ValueError(f"Invalid YAML in configuration file {config_path}: {e}")
         except Exception as e:
             raise RuntimeError(f"Failed to load configuration from {config_path}: {e}")
+        
+        return config
+    
+    def _load_mapped(self, config_path: str, data) -> Dict[str, Any]:
+        """Parse the YAML in data (bytes or a mapping), going through the per-user parse cache"""
+        # Parsed configs and their dot-notation index are cached per user,
+        # outside the checkout, keyed by a hash of the YAML content. marshal
+        # only round-trips plain data, so a bad cache file can't run code.
+        cache_path = os.path.join(_cache_dir(), hashlib.sha256(data).hexdigest() + '.marshal')
+        try:
+            with open(cache_path, 'rb') as cache:
+                config, parsed = marshal.load(cache)
+            self._parsed = parsed
+            print(f"✅ Configuration loaded from: {config_path} (cached)")
+            return config
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        
+        config = yaml.load(data, Loader=YamlLoader)
+        print(f"✅ Configuration loaded from: {config_path}")
+        
+        self._parsed = self._flatten(config)
+        try:
+            payload = marshal.dumps((config, self._parsed))
+            os.makedirs(os.path.dirname(cache_path), mode=0o700, exist_ok=True)
+            # mkstemp creates the file 0600; the rename makes it visible complete
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+            with os.fdopen(fd, 'wb') as cache:
+                cache.write(payload)
+            os.replace(tmp_path, cache_path)
+        except (OSError, ValueError):
+            # No writable cache dir, or values marshal can't store (e.g. dates);
+            # the cache is only an optimisation
+            pass
+        
+        return config
     
     def get(self, key_path: str, default: Any = None) -> Any:
         """
@@ -61,15 +123,42 @@ class DeploymentConfig:
         Returns:
             Configuration value or default
         """
-        keys = key_path.split('.')
-        value = self.config
+        # The index is always built (or restored) by _load_config
+        return self._parsed.get(key_path, default)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Flatten the configuration into a dot-notation index
         
-        try:
-            for key in keys:
-                value = value[key]
-            return value
-        except (KeyError, TypeError):
-            return default
+        The YAML tree is walked once at load (or restored from the parse
+        cache) and every reachable path (leaves and intermediate sections)
+        is stored, so later lookups are a single dict hit instead of a
+        split + nested traversal.
+        
+        Returns:
+            Dictionary mapping dot-separated key paths to their values
+        """
+        if self._parsed is None:
+            self._parsed = self._flatten(self.config)
+        return self._parsed
+    
+    @staticmethod
+    def _flatten(config) -> Dict[str, Any]:
+        """Map every reachable dot-separated key path to its value"""
+        parsed = {}
+        stack = [('', config)]
+        while stack:
+            prefix, node = stack.pop()
+            if not isinstance(node, dict):
+                continue
+            for key, value in node.items():
+                # Only string keys without dots are reachable via get()
+                if not isinstance(key, str) or '.' in key:
+                    continue
+                path = f"{prefix}.{key}" if prefix else key
+                parsed[path] = value
+                stack.append((path, value))
+        return parsed
     
     def get_aws_region(self) -> str:
         """Get AWS region from configuration"""
@@ -6,16 +6,157 @@ based on configuration settings (Apache, MySQL, PHP, Python, Node.js, etc.)
 Supports multiple operating systems: Ubuntu, Amazon Linux, CentOS, RHEL
 """
 
+import os
 import sys
 import json
-from typing import Dict, List, Any, Tuple
+import functools
+import hashlib
+import heapq
+import logging
+import queue
+import re
+import shlex
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from graphlib import TopologicalSorter
+from string import Template
+from typing import Dict, List, Any, Set, Tuple
 from config_loader import DeploymentConfig
 from lightsail_rds import LightsailRDSManager
 from os_detector import OSDetector
 
+# Progress messages; the default formatter writes just the message
+logger = logging.getLogger('dependency_manager')
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler(sys.stdout))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Static files (default pages) rendered into the remote scripts
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+
+@functools.lru_cache(maxsize=None)
+def _load_template(name: str) -> Template:
+    """Read (once) a ${PLACEHOLDER} template from TEMPLATE_DIR"""
+    with open(os.path.join(TEMPLATE_DIR, name), encoding='utf-8') as template_file:
+        return Template(template_file.read())
+
+
+@contextmanager
+def _queued_logging():
+    """Hand log records to a listener thread that formats and writes them"""
+    handlers = logger.handlers
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers)
+    logger.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    try:
+        yield
+    finally:
+        # Drains the queue before the direct handlers come back
+        listener.stop()
+        logger.handlers = handlers
+
+# Install failures that a second attempt can't fix
+NON_RETRYABLE_ERRORS = (
+    re.compile(r'^E: Unable to locate package', re.M),
+    re.compile(r'^E: Package .* has no installation candidate', re.M),
+    re.compile(r'No package .* available'),
+    re.compile(r'No match for argument'),
+    re.compile(r'No space left on device'),
+)
+
+# Install, enable and start a single service; filled in with str.format
+SERVICE_INSTALL_SCRIPT = '''
+set -e
+echo "Installing {name}{on_os}..."
+
+# Install {name}
+{install_command}
+
+# Enable {name} to start on boot and start it
+{enable_now} {service}
+
+echo "✅ {name} installation completed{on_os}"
+'''
+
 class DependencyManager:
     """Manages installation and configuration of application dependencies"""
     
+    # Dependencies whose packages (keys into os_packages) can go into the up-front
+    # batch install. PHP, Node.js and Docker need extra repositories set up first.
+    BATCH_PACKAGE_KEYS = {
+        'apache': 'apache',
+        'nginx': 'nginx',
+        'mysql': 'mysql_server',
+        'postgresql': 'postgresql_server',
+        'redis': 'redis',
+        'git': 'git',
+        'firewall': 'firewall',
+    }
+    
+    # Helper packages pulled into the batch for each dependency, per package manager
+    COMMON_PACKAGES = {
+        'apache': {'apt': ('curl', 'wget', 'unzip'), 'yum': ('curl', 'wget', 'unzip')},
+        'nginx': {'apt': ('curl', 'wget', 'unzip'), 'yum': ('curl', 'wget', 'unzip')},
+        'php': {'apt': ('curl', 'wget', 'unzip', 'software-properties-common'), 'yum': ('curl', 'wget', 'unzip')},
+        'nodejs': {'apt': ('curl', 'software-properties-common'), 'yum': ('curl',)},
+        'python': {'apt': ('python3', 'python3-pip', 'python3-venv'), 'yum': ('python3', 'python3-pip')},
+        # The v2 installer zip is unpacked on the instance
+        'awscli': {'apt': ('unzip',), 'yum': ('unzip',)},
+    }
+    
+    # Dependencies with no ordering constraints on each other or on the web/app
+    # stack; once the serial ones are done these install concurrently
+    INDEPENDENT_DEPENDENCIES = frozenset({
+        'git', 'redis', 'memcached', 'monitoring', 'ssl_certificates', 'docker',
+        'awscli',
+    })
+    
+    # Serializes package list refreshes (apt-get update, add-apt-repository,
+    # repository setup scripts) between concurrent install sessions: apt's
+    # DPkg::Lock::Timeout only covers the dpkg locks, not /var/lib/apt/lists/lock
+    APT_LISTS_LOCK = '/var/lock/app-deploy-apt-lists.lock'
+    
+    # Touched after each successful full apt-get update; its mtime drives the freshness check
+    APT_UPDATE_STAMP = '/var/lib/app-deploy/apt-update-stamp'
+    
+    # Extensions compiled into PHP itself: PDO is part of php-common and
+    # JSON is built into PHP 8.0+, so neither has a package of its own
+    PHP_BUILTIN_EXTENSIONS = frozenset({'pdo', 'json'})
+    
+    # (extension, package manager) -> packages, formatted with the PHP version;
+    # anything not listed installs php-<extension>
+    PHP_EXTENSION_PACKAGES = {
+        ('pdo_mysql', 'apt'): ('php-mysql', 'php{version}-mysql'),
+        ('mysql', 'apt'): ('php-mysql', 'php{version}-mysql'),
+        ('pdo_mysql', 'yum'): ('php-mysqlnd',),
+        ('mysql', 'yum'): ('php-mysqlnd',),
+        ('pdo_pgsql', 'apt'): ('php-pgsql', 'php{version}-pgsql'),
+        ('pgsql', 'apt'): ('php-pgsql', 'php{version}-pgsql'),
+        ('pdo_pgsql', 'yum'): ('php-pgsql',),
+        ('pgsql', 'yum'): ('php-pgsql',),
+        ('redis', 'apt'): ('php-redis', 'php{version}-redis'),
+    }
+    
+    # Preferred installation order, used to break ties between dependencies
+    # the graph below leaves unordered; unknown dependencies go last
+    DEPENDENCY_ORDER = (
+        'git', 'firewall', 'apache', 'nginx', 'mysql', 'postgresql',
+        'php', 'python', 'nodejs', 'redis', 'memcached', 'docker', 'awscli',
+        'ssl_certificates', 'monitoring',
+    )
+    DEPENDENCY_PRIORITY = {dep: index for index, dep in enumerate(DEPENDENCY_ORDER)}
+    
+    # dependency -> dependencies that must be installed before it (when enabled)
+    DEPENDENCY_EDGES: Dict[str, Set[str]] = {
+        'php': {'apache', 'nginx'},
+        'ssl_certificates': {'apache', 'nginx'},
+    }
+    
     def __init__(self, lightsail_client, config: DeploymentConfig, os_type: str = None, os_info: Dict[str, str] = None):
         """
         Initialize dependency manager
@@ -31,46 +172,81 @@ class DependencyManager:
         self.installed_dependencies = []
         self.failed_dependencies = []
         
+        # Filled by the batch install; those packages are skipped by the per-dependency scripts
+        self._preinstalled_packages = set()
+        self._preinstalled_deps = set()
+        
+        # dep_name -> installed? Filled by _probe_installed_dependencies or on demand
+        self._install_state_cache: Dict[str, bool] = {}
+        
         # Set OS information
         self.os_type = os_type or 'ubuntu'
         self.os_info = os_info or {'package_manager': 'apt', 'service_manager': 'systemd', 'user': 'ubuntu'}
         
         # Get OS-specific command templates
         self.pkg_commands = OSDetector.get_package_manager_commands(self.os_info['package_manager'])
+        
+        # Server installs skip apt's recommended packages unless a dependency sets
+        # `recommends: true`; dpkg keeps existing config files without prompting
+        self._install_with_recommends = self.pkg_commands['install']
+        if self.os_info['package_manager'] == 'apt':
+            dpkg_options = '-o Dpkg::Use-Pty=0 -o Dpkg::Options::=--force-confold'
+            self._install_with_recommends = f"{self.pkg_commands['install']} {dpkg_options}"
+            self.pkg_commands['install'] = f"{self.pkg_commands['install']} --no-install-recommends {dpkg_options}"
+        elif self.config.get('dependencies.parallel_downloads', False):
+            # dnf fetches packages concurrently when asked to; apt needs apt-fast
+            # (see _enable_parallel_downloads)
+            self.pkg_commands['install'] = f"{self.pkg_commands['install']} --setopt=max_parallel_downloads=10"
+            self._install_with_recommends = self.pkg_commands['install']
         self.svc_commands = OSDetector.get_service_commands(self.os_info['service_manager'])
         self.os_packages = OSDetector.get_os_specific_packages(self.os_type, self.os_info['package_manager'])
         self.user_info = OSDetector.get_user_info(self.os_type)
         
-        print(f"🖥️  Detected OS: {self.os_type} with {self.os_info['package_manager']} package manager")
+        # Per-dependency configuration sections, read once
+        self._dep_cfg: Dict[str, Dict[str, Any]] = {
+            dep_name: dep_config
+            for dep_name, dep_config in (self.config.get('dependencies', {}) or {}).items()
+            if isinstance(dep_config, dict)
+        }
+        
+        # Output of the current install attempt's failed script, per install thread
+        self._attempt = threading.local()
+        
+        # The install probes only depend on the OS, so build them once
+        self._check_commands = self._dependency_check_commands()
+        
+        logger.info(f"🖥️  Detected OS: {self.os_type} with {self.os_info['package_manager']} package manager")
     
     def get_enabled_dependencies(self) -> List[str]:
         """Get list of enabled dependencies from configuration"""
-        dependencies = []
-        deps_config = self.config.get('dependencies', {})
-        
-        for dep_name, dep_config in deps_config.items():
-            if isinstance(dep_config, dict) and dep_config.get('enabled', False):
-                dependencies.append(dep_name)
-        
-        return dependencies
+        return [dep_name for dep_name, dep_config in self._dep_cfg.items() if dep_config.get('enabled', False)]
     
-    def install_all_dependencies(self) -> Tuple[bool, List[str], List[str]]:
+    def install_all_dependencies(self, force_refresh: bool = False) -> Tuple[bool, List[str], List[str]]:
         """
         Install all enabled dependencies
         
+        Args:
+            force_refresh: Run apt-get update even if the package lists are fresh
+            
         Returns:
             Tuple of (success, installed_deps, failed_deps)
         """
+        # Keep formatting and stdout writes off the install threads
+        with _queued_logging():
+            return self._install_all_dependencies(force_refresh)
+    
+    def _install_all_dependencies(self, force_refresh: bool) -> Tuple[bool, List[str], List[str]]:
+        """Install all enabled dependencies (see install_all_dependencies)"""
         enabled_deps = self.get_enabled_dependencies()
         
         if not enabled_deps:
-            print("ℹ️  No dependencies enabled in configuration")
+            logger.info("ℹ️  No dependencies enabled in configuration")
             return True, [], []
         
-        print(f"📦 Installing {len(enabled_deps)} enabled dependencies: {', '.join(enabled_deps)}")
+        logger.info(f"📦 Installing {len(enabled_deps)} enabled dependencies: {', '.join(enabled_deps)}")
         
         # First, check and fix package manager if it's in a broken state
-        print(f"\n🔧 Checking {self.os_info['package_manager']} state...")
+        logger.info(f"\n🔧 Checking {self.os_info['package_manager']} state...")
         if self.os_info['package_manager'] == 'apt':
             fix_script = '''
 # Check if dpkg is in a broken state
@@ -94,19 +270,34 @@ echo "✅ Package manager state verified"
         
         success, output = self.client.run_command(fix_script, timeout=180)
         if not success:
-            print(f"⚠️  {self.os_info['package_manager']} check/fix failed, but continuing...")
+            logger.warning(f"⚠️  {self.os_info['package_manager']} check/fix failed, but continuing...")
         else:
-            print(f"✅ {self.os_info['package_manager']} state verified")
+            logger.info(f"✅ {self.os_info['package_manager']} state verified")
         
         # Update package lists/cache
-        print(f"\n🔄 Updating package lists using {self.os_info['package_manager']}...")
+        logger.info(f"\n🔄 Updating package lists using {self.os_info['package_manager']}...")
         if self.os_info['package_manager'] == 'apt':
-            update_script = '''
+            # The stamp is touched only after a successful full update, so single-source
+            # refreshes (docker.list, ...) never make the main index look fresh
+            freshness_check = ''
+            if not force_refresh:
+                freshness_check = f'''
+LISTS_AGE=$(( $(date +%s) - $(stat -c %Y {self.APT_UPDATE_STAMP} 2>/dev/null || echo 0) ))
+if [ $LISTS_AGE -lt 3600 ]; then
+    echo "✅ Package lists are fresh (updated ${{LISTS_AGE}}s ago), skipping apt-get update"
+    exit 0
+fi
+'''
+            update_script = f'''
 set -e
+# Let concurrent apt-get runs queue on the dpkg lock instead of failing
+echo 'DPkg::Lock::Timeout "300";' | sudo tee /etc/apt/apt.conf.d/90lock-timeout > /dev/null
+{freshness_check}
 echo "Running apt-get update..."
 # Use faster update with reduced timeout for GitHub Actions
 export DEBIAN_FRONTEND=noninteractive
-sudo apt-get update -qq -o Acquire::Retries=2 -o Acquire::http::Timeout=30
+sudo flock {self.APT_LISTS_LOCK} apt-get update -qq -o Acquire::Retries=2 -o Acquire::http::Timeout=30
+sudo install -D -m 644 /dev/null {self.APT_UPDATE_STAMP}
 echo "✅ Package lists updated"
 '''
         else:
@@ -120,127 +311,313 @@ echo "✅ Package cache updated"
         
         success, output = self.client.run_command(update_script, timeout=180)
         if not success:
-            print(f"⚠️  {self.os_info['package_manager']} update failed, but continuing with installations...")
+            logger.warning(f"⚠️  {self.os_info['package_manager']} update failed, but continuing with installations...")
         else:
-            print("✅ Package lists updated successfully")
+            logger.info("✅ Package lists updated successfully")
         
-        # Install dependencies in order of priority
-        dependency_order = [
-            'git', 'firewall', 'apache', 'nginx', 'mysql', 'postgresql', 
-            'php', 'python', 'nodejs', 'redis', 'memcached', 'docker',
-            'ssl_certificates', 'monitoring'
-        ]
-        
-        # Sort enabled dependencies by priority order
-        sorted_deps = []
-        for dep in dependency_order:
-            if dep in enabled_deps:
-                sorted_deps.append(dep)
+        if self.os_info['package_manager'] == 'apt' and self.config.get('dependencies.parallel_downloads', False):
+            self._enable_parallel_downloads()
         
-        # Add any remaining dependencies not in the priority list
-        for dep in enabled_deps:
-            if dep not in sorted_deps:
-                sorted_deps.append(dep)
+        # Install dependencies in order of priority, respecting DEPENDENCY_EDGES
+        sorted_deps = self._sort_dependencies(enabled_deps)
         
         overall_success = True
         
-        # Batch install common system packages first for efficiency
+        # One round trip to learn what is already there, instead of a probe per dependency
+        self._probe_installed_dependencies(sorted_deps)
+        
+        # Install every batchable package in one transaction; the per-dependency
+        # steps below then only configure, enable and start
+        self._wait_for_package_lock()
         self._batch_install_common_packages(sorted_deps)
         
-        for dep_name in sorted_deps:
-            print(f"\n🔧 Installing {dep_name}...")
-            success = self._install_dependency(dep_name)
+        serial_deps = [dep for dep in sorted_deps if dep not in self.INDEPENDENT_DEPENDENCIES]
+        parallel_deps = [dep for dep in sorted_deps if dep in self.INDEPENDENT_DEPENDENCIES]
+        
+        # Independent installs run alongside the serial chain on their own SSH
+        # sessions; any that need a serial dependency start once the chain is done.
+        # DPkg::Lock::Timeout makes concurrent package transactions queue on the
+        # dpkg lock and APT_LISTS_LOCK serializes list refreshes, so nobody runs
+        # the lock wait (it kills lock holders).
+        # They use run_command, not live output, so their logs print as blocks.
+        serial_set = set(serial_deps)
+        early_deps = [dep for dep in parallel_deps if not self.DEPENDENCY_EDGES.get(dep, set()) & serial_set]
+        late_deps = [dep for dep in parallel_deps if dep not in early_deps]
+        
+        outcomes = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(parallel_deps)))) as executor:
+            if early_deps:
+                logger.info(f"\n🔧 Installing {', '.join(early_deps)} in the background...")
+            futures = {dep_name: executor.submit(self._install_dependency, dep_name, False)
+                       for dep_name in early_deps}
+            
+            for dep_name in serial_deps:
+                logger.info(f"\n🔧 Installing {dep_name}...")
+                outcomes[dep_name] = self._install_dependency(dep_name, wait_for_lock=not futures)
             
+            if late_deps:
+                logger.info(f"\n🔧 Installing {', '.join(late_deps)} in parallel...")
+            futures.update((dep_name, executor.submit(self._install_dependency, dep_name, False))
+                           for dep_name in late_deps)
+            for dep_name, future in futures.items():
+                outcomes[dep_name] = future.result()
+        
+        results = [(dep_name, outcomes[dep_name]) for dep_name in sorted_deps]
+        
+        for dep_name, success in results:
             if success:
                 self.installed_dependencies.append(dep_name)
-                print(f"✅ {dep_name} installed successfully")
+                logger.info(f"✅ {dep_name} installed successfully")
             else:
                 self.failed_dependencies.append(dep_name)
-                print(f"❌ {dep_name} installation failed")
+                logger.error(f"❌ {dep_name} installation failed")
                 overall_success = False
         
         return overall_success, self.installed_dependencies, self.failed_dependencies
     
-    def _batch_install_common_packages(self, enabled_deps: List[str]):
-        """Batch install common system packages for efficiency"""
-        common_packages = []
+    @classmethod
+    def _sort_dependencies(cls, enabled_deps: List[str]) -> List[str]:
+        """
+        Order enabled dependencies so each comes after the ones it needs
         
-        # Collect common packages needed by multiple dependencies (OS-agnostic names)
-        if any(dep in enabled_deps for dep in ['apache', 'nginx', 'php']):
-            common_packages.extend(['curl', 'wget', 'unzip'])
+        Args:
+            enabled_deps: Enabled dependency names, in configuration order
+            
+        Returns:
+            Dependencies in installation order
+        """
+        enabled = set(enabled_deps)
+        # Unknown dependencies rank after the known ones, in configuration order
+        rank = {dep: cls.DEPENDENCY_PRIORITY.get(dep, len(cls.DEPENDENCY_ORDER) + index)
+                for index, dep in enumerate(enabled_deps)}
         
-        if 'git' in enabled_deps:
-            common_packages.append('git')
+        sorter = TopologicalSorter({dep: cls.DEPENDENCY_EDGES.get(dep, set()) & enabled
+                                    for dep in enabled_deps})
+        sorter.prepare()
         
-        if 'nodejs' in enabled_deps:
-            common_packages.append('curl')
-            # Add OS-specific packages for Node.js setup
-            if self.os_info['package_manager'] == 'apt':
-                common_packages.append('software-properties-common')
+        # Kahn's algorithm, always taking the highest-priority ready dependency
+        ready = []
+        sorted_deps = []
+        while sorter.is_active():
+            for dep in sorter.get_ready():
+                heapq.heappush(ready, (rank[dep], dep))
+            _, dep = heapq.heappop(ready)
+            sorted_deps.append(dep)
+            sorter.done(dep)
+        return sorted_deps
+    
+    def _collect_all_packages(self, sorted_deps: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Collect every OS package that can be installed in one transaction
         
-        if 'python' in enabled_deps:
-            if self.os_info['package_manager'] == 'apt':
-                common_packages.extend(['python3', 'python3-pip', 'python3-venv'])
-            else:
-                common_packages.extend(['python3', 'python3-pip'])
+        Args:
+            sorted_deps: Enabled dependencies in installation order
+            
+        Returns:
+            Tuple of (packages, dependencies whose own packages are included)
+        """
+        packages = []
+        batched_deps = []
+        
+        # Helper packages the later install steps rely on
+        package_manager = 'apt' if self.os_info['package_manager'] == 'apt' else 'yum'
+        for dep_name in sorted_deps:
+            # With recommends, python3-pip has to come from the Python step itself
+            if dep_name == 'python' and self._dep_cfg.get('python', {}).get('recommends', False):
+                continue
+            packages.extend(self.COMMON_PACKAGES.get(dep_name, {}).get(package_manager, ()))
+        
+        # Packages of the apt-only installers; their own scripts then find them installed
+        if package_manager == 'apt':
+            for dep_name in sorted_deps:
+                if not self._dep_cfg.get(dep_name, {}).get('recommends', False):
+                    packages.extend(self._apt_installer_packages(dep_name))
+        
+        # Each dependency's own packages, unless it is external or already there
+        for dep_name in sorted_deps:
+            package_key = self.BATCH_PACKAGE_KEYS.get(dep_name)
+            if not package_key or self._dep_cfg.get(dep_name, {}).get('external', False):
+                continue
+            if self._dep_cfg.get(dep_name, {}).get('recommends', False):
+                continue
+            if self._is_dependency_installed(dep_name):
+                continue
+            packages.extend(self.os_packages.get(package_key, {}).get('packages', []))
+            batched_deps.append(dep_name)
+        
+        # Remove duplicates, keeping the order
+        return list(dict.fromkeys(packages)), batched_deps
+    
+    def _enable_parallel_downloads(self):
+        """Switch apt installs to apt-fast, which fetches packages over parallel aria2 connections"""
+        logger.info("\n⚡ Enabling parallel package downloads (apt-fast)...")
+        script = f'''
+set -e
+export DEBIAN_FRONTEND=noninteractive
+if ! command -v apt-fast > /dev/null 2>&1; then
+    echo "Installing apt-fast and aria2..."
+    # Answer apt-fast's setup questions up front
+    echo "apt-fast apt-fast/aptmanager select apt-get" | sudo debconf-set-selections
+    echo "apt-fast apt-fast/dlflag boolean true" | sudo debconf-set-selections
+    # add-apt-repository refreshes the package lists itself
+    sudo flock {self.APT_LISTS_LOCK} add-apt-repository -y ppa:apt-fast/stable > /dev/null
+    {self.pkg_commands['install']} aria2 apt-fast
+fi
+
+# aria2 handles the download phase; dpkg still installs in one transaction
+sudo tee /etc/apt-fast.conf > /dev/null << 'EOF'
+_APTMGR=apt-get
+DOWNLOADBEFORE=true
+_MAXNUM=16
+_MAXCONPERSRV=8
+_SPLITCON=3
+EOF
+echo "✅ apt-fast ready"
+'''
         
-        if 'php' in enabled_deps and self.os_info['package_manager'] == 'apt':
-            common_packages.append('software-properties-common')
+        success, _ = self.client.run_command(script, timeout=180)
+        if not success:
+            logger.warning("⚠️  apt-fast unavailable, keeping apt-get downloads")
+            return
         
-        # Remove duplicates and install in batch
-        if common_packages:
-            unique_packages = list(set(common_packages))
-            print(f"\n📦 Batch installing common packages: {', '.join(unique_packages)}")
+        self.pkg_commands['install'] = self.pkg_commands['install'].replace('apt-get install', 'apt-fast install')
+        self._install_with_recommends = self._install_with_recommends.replace('apt-get install', 'apt-fast install')
+    
+    @classmethod
+    def _apt_update_source(cls, list_name: str) -> str:
+        """apt-get update for a single sources.list.d file, after adding that repository"""
+        # The other lists are already fresh (see install_all_dependencies); keep them
+        return (f"sudo flock {cls.APT_LISTS_LOCK} apt-get update -qq -o Dir::Etc::sourcelist=sources.list.d/{list_name} "
+                f"-o Dir::Etc::sourceparts=- -o APT::Get::List-Cleanup=0")
+    
+    def _apt_installer_packages(self, dep_name: str) -> List[str]:
+        """Packages the apt-only installers (Memcached, Certbot, AWS CLI, monitoring) install"""
+        dep_config = self._dep_cfg.get(dep_name, {})
+        settings = dep_config.get('config', {})
+        if dep_name == 'memcached':
+            return ['memcached']
+        if dep_name == 'ssl_certificates' and settings.get('provider', 'letsencrypt') == 'letsencrypt':
+            return ['certbot', 'python3-certbot-apache']
+        if dep_name == 'awscli':
+            return ['unzip'] if settings.get('version', '2') == '2' else ['awscli']
+        if dep_name == 'monitoring':
+            return list(settings.get('tools', ['htop']))
+        return []
+    
+    def _batch_install_common_packages(self, sorted_deps: List[str]):
+        """Install the packages of all enabled dependencies in one transaction"""
+        packages, batched_deps = self._collect_all_packages(sorted_deps)
+        
+        if packages:
+            logger.info(f"\n📦 Batch installing packages: {', '.join(packages)}")
             
             if self.os_info['package_manager'] == 'apt':
                 batch_script = f'''
 set -e
 export DEBIAN_FRONTEND=noninteractive
-echo "Installing common packages in batch for efficiency..."
-{self.pkg_commands['install']} {' '.join(unique_packages)}
-echo "✅ Common packages installed"
+echo "Installing packages in one transaction..."
+{self.pkg_commands['install']} {shlex.join(packages)}
+echo "✅ Packages installed"
 '''
             else:
                 batch_script = f'''
 set -e
-echo "Installing common packages in batch for efficiency..."
-{self.pkg_commands['install']} {' '.join(unique_packages)}
-echo "✅ Common packages installed"
+echo "Installing packages in one transaction..."
+{self.pkg_commands['install']} {shlex.join(packages)}
+echo "✅ Packages installed"
 '''
             
-            success, output = self.client.run_command(batch_script, timeout=300)
+            success, output = self.client.run_command(batch_script, timeout=600)
             if success:
-                print("✅ Batch installation completed successfully")
+                logger.info("✅ Batch installation completed successfully")
+                self._preinstalled_packages = set(packages)
+                self._preinstalled_deps = set(batched_deps)
             else:
-                print("⚠️  Batch installation had issues, individual installs will proceed")
+                logger.warning("⚠️  Batch installation had issues, individual installs will proceed")
     
-    def _is_dependency_installed(self, dep_name: str) -> bool:
-        """Quick check if a dependency is already installed (OS-agnostic)"""
+    def _install_command(self, config: Dict[str, Any]) -> str:
+        """Package install command for a dependency, honouring its `recommends` flag"""
+        if config.get('recommends', False):
+            return self._install_with_recommends
+        return self.pkg_commands['install']
+    
+    def _package_install_command(self, packages: List[str], config: Dict[str, Any]) -> str:
+        """Install command for a script, skipping packages the batch install already covered"""
+        remaining = [package for package in packages if package not in self._preinstalled_packages]
+        if not remaining:
+            return f'echo "✅ {" ".join(packages)} already installed in batch"'
+        return f"{self._install_command(config)} {shlex.join(remaining)}"
+    
+    def _dependency_check_commands(self) -> Dict[str, str]:
+        """Shell commands that succeed when a dependency is already installed (OS-agnostic)"""
         # Get OS-specific service names
-        apache_service = self.os_packages.get('apache', {}).get('service', 'apache2')
-        redis_service = self.os_packages.get('redis', {}).get('service', 'redis-server')
+        apache_service = self.os_packages['apache']['service']
+        redis_service = self.os_packages['redis']['service']
+        
+        # Where the installer pins the configured version, only that version counts
+        # as installed, so changing it in the config triggers a reinstall
+        php_check = 'command -v php >/dev/null 2>&1'
+        php_version = self._dep_cfg.get('php', {}).get('version')
+        if php_version and self.os_info['package_manager'] == 'apt':
+            php_check = f'command -v php{php_version} >/dev/null 2>&1'
+        node_check = 'command -v node >/dev/null 2>&1'
+        node_version = self._dep_cfg.get('nodejs', {}).get('version')
+        if node_version:
+            node_check = f'[[ "$(node --version 2>/dev/null)" == v{node_version}.* ]]'
         
-        check_commands = {
+        return {
             'apache': f'{self.svc_commands["is_active"]} {apache_service}',
             'nginx': f'{self.svc_commands["is_active"]} nginx',
             'mysql': 'command -v mysql >/dev/null 2>&1',
             'postgresql': 'command -v psql >/dev/null 2>&1',
-            'php': 'command -v php >/dev/null 2>&1',
+            'php': php_check,
             'python': 'command -v python3 >/dev/null 2>&1',
-            'nodejs': 'command -v node >/dev/null 2>&1',
+            'nodejs': node_check,
             'redis': f'{self.svc_commands["is_active"]} {redis_service} || {self.svc_commands["is_active"]} redis',
             'git': 'command -v git >/dev/null 2>&1',
             'docker': 'command -v docker >/dev/null 2>&1'
         }
+    
+    def _probe_installed_dependencies(self, dep_names: List[str]):
+        """Check several dependencies in one SSH round trip and cache the results"""
+        check_commands = self._check_commands
+        probes = [dep for dep in dep_names if dep in check_commands and dep not in self._install_state_cache]
+        if not probes:
+            return
+        
+        script = '\n'.join(
+            f'if {check_commands[dep]}; then echo "{dep}:installed"; else echo "{dep}:missing"; fi'
+            for dep in probes
+        )
+        success, output = self.client.run_command(script, timeout=30, max_retries=1)
+        if not success:
+            # Leave the cache empty; _is_dependency_installed probes one by one
+            return
+        
+        for line in output.splitlines():
+            dep, _, state = line.strip().partition(':')
+            if dep in probes and state in ('installed', 'missing'):
+                self._install_state_cache[dep] = state == 'installed'
+    
+    def _is_dependency_installed(self, dep_name: str) -> bool:
+        """Quick check if a dependency is already installed (OS-agnostic)"""
+        if dep_name in self._install_state_cache:
+            return self._install_state_cache[dep_name]
         
+        check_commands = self._check_commands
         if dep_name not in check_commands:
             return False
         
         success, _ = self.client.run_command(check_commands[dep_name], timeout=10, max_retries=1)
+        self._install_state_cache[dep_name] = success
         return success
     
     def _wait_for_package_lock(self, timeout=60):
         """Wait for package manager lock to be released (OS-agnostic)"""
+        self.client.run_command(self._package_lock_wait_script(), timeout=timeout + 10)
+    
+    def _package_lock_wait_script(self) -> str:
+        """Script that waits (up to 60s) for the package manager lock; it exits early once free"""
         if self.os_info['package_manager'] == 'apt':
             wait_script = '''
 # Quick check for dpkg lock
@@ -252,18 +629,27 @@ fi
 # Wait for lock to be released
 echo "⏳ Waiting for dpkg lock (max 60s)..."
 timeout=60
-elapsed=0
+SECONDS=0
+next_report=10
 while sudo fuser /var/lib/dpkg/lock-frontend >/dev/null 2>&1 || sudo fuser /var/lib/dpkg/lock >/dev/null 2>&1; do
-    if [ $elapsed -ge $timeout ]; then
+    if [ $SECONDS -ge $timeout ]; then
         echo "⚠️  dpkg still locked after ${timeout}s, proceeding anyway..."
         # Kill any stuck apt processes
         sudo killall apt apt-get dpkg 2>/dev/null || true
         sleep 2
         break
     fi
-    sleep 2
-    elapsed=$((elapsed + 2))
-    [ $((elapsed % 10)) -eq 0 ] && echo "   Still waiting... (${elapsed}s)"
+    # Wake as soon as the holder closes the lock file (re-checked above);
+    # plain polling where inotify-tools isn't installed
+    if command -v inotifywait >/dev/null 2>&1; then
+        sudo inotifywait -qq -t 2 -e close_write -e delete_self /var/lib/dpkg/lock-frontend /var/lib/dpkg/lock 2>/dev/null || true
+    else
+        sleep 1
+    fi
+    if [ $SECONDS -ge $next_report ]; then
+        echo "   Still waiting... (${SECONDS}s)"
+        next_report=$((next_report + 10))
+    fi
 done
 echo "✅ Proceeding with installation"
 '''
@@ -279,56 +665,116 @@ fi
 # Wait for lock to be released
 echo "⏳ Waiting for {self.os_info['package_manager']} lock (max 60s)..."
 timeout=60
-elapsed=0
+SECONDS=0
+next_report=10
 while sudo fuser /var/run/yum.pid >/dev/null 2>&1; do
-    if [ $elapsed -ge $timeout ]; then
+    if [ $SECONDS -ge $timeout ]; then
         echo "⚠️  {self.os_info['package_manager']} still locked after ${{timeout}}s, proceeding anyway..."
         # Kill any stuck yum processes
         sudo killall yum dnf 2>/dev/null || true
         sleep 2
         break
     fi
-    sleep 2
-    elapsed=$((elapsed + 2))
-    [ $((elapsed % 10)) -eq 0 ] && echo "   Still waiting... (${{elapsed}}s)"
+    # Wake as soon as yum removes its pid file (re-checked above);
+    # plain polling where inotify-tools isn't installed
+    if command -v inotifywait >/dev/null 2>&1; then
+        sudo inotifywait -qq -t 2 -e delete_self /var/run/yum.pid 2>/dev/null || true
+    else
+        sleep 1
+    fi
+    if [ $SECONDS -ge $next_report ]; then
+        echo "   Still waiting... (${{SECONDS}}s)"
+        next_report=$((next_report + 10))
+    fi
 done
 echo "✅ Proceeding with installation"
 '''
         
-        self.client.run_command(wait_script, timeout=timeout + 10)
+        return wait_script
     
-    def _install_dependency(self, dep_name: str) -> bool:
-        """Install a specific dependency with retry logic"""
-        dep_config = self.config.get(f'dependencies.{dep_name}', {})
+    def _install_dependency(self, dep_name: str, wait_for_lock: bool = True) -> bool:
+        """
+        Install a specific dependency with retry logic
         
-        # Wait for any existing package manager locks before starting
-        self._wait_for_package_lock()
+        Args:
+            dep_name: Name of the dependency to install
+            wait_for_lock: Wait for the package manager lock first. Concurrent
+                installs pass False: the wait kills lock holders after a
+                timeout, which would include the other installs.
+        """
+        dep_config = self._dep_cfg.get(dep_name, {})
         
         # Try installation with retry on failure
         max_retries = 2
         for attempt in range(max_retries):
             if attempt > 0:
-                print(f"🔄 Retry attempt {attempt + 1}/{max_retries} for {dep_name}...")
-                # On retry, wait for locks and try to fix package manager
-                self._wait_for_package_lock()
-                fix_script = self.pkg_commands['fix_broken']
-                self.client.run_command(fix_script, timeout=60)
+                logger.info(f"🔄 Retry attempt {attempt + 1}/{max_retries} for {dep_name}...")
             
+            # Wait for package manager locks (and on retry fix the package manager)
+            if self._prepare_for_install(dep_name, attempt, wait_for_lock):
+                logger.info(f"✅ {dep_name} is already installed, skipping...")
+                return True
+            
+            self._attempt.output = ''
             success = self._do_install_dependency(dep_name, dep_config)
             if success:
+                self._install_state_cache[dep_name] = True
                 return True
             
+            if any(pattern.search(self._attempt.output) for pattern in NON_RETRYABLE_ERRORS):
+                logger.error(f"❌ {dep_name} failed with an error a retry won't fix, not retrying")
+                break
+            
             if attempt < max_retries - 1:
-                print(f"⚠️  Installation failed, will retry...")
+                logger.warning(f"⚠️  Installation failed, will retry...")
         
         return False
     
+    def _prepare_for_install(self, dep_name: str, attempt: int, wait_for_lock: bool) -> bool:
+        """
+        Run the pre-install steps of one attempt in a single SSH call
+        
+        Combines the package lock wait, the already-installed check (unless
+        the probe or the batch install settled it) and, on retries, the
+        package manager repair.
+        
+        Args:
+            dep_name: Name of the dependency about to be installed
+            attempt: Zero-based attempt number
+            wait_for_lock: Include the package manager lock wait
+            
+        Returns:
+            bool: True if the dependency turned out to be installed already
+        """
+        check = (dep_name in self._check_commands
+                 and dep_name not in self._install_state_cache
+                 and dep_name not in self._preinstalled_deps)
+        
+        steps = []
+        if wait_for_lock:
+            # Subshell, since the wait exits as soon as the lock is free
+            steps.append(f'(\n{self._package_lock_wait_script()}\n)')
+        if check:
+            steps.append(f'if {self._check_commands[dep_name]}; then echo "{dep_name}:installed"; exit 0; fi')
+        if attempt > 0:
+            steps.append(self.pkg_commands['fix_broken'])
+        if not steps:
+            return False
+        
+        success, output = self.client.run_command('\n'.join(steps), timeout=130)
+        if check and success:
+            installed = f'{dep_name}:installed' in output.splitlines()
+            self._install_state_cache[dep_name] = installed
+            return installed
+        return False
+    
     def _do_install_dependency(self, dep_name: str, dep_config: dict) -> bool:
         """Perform the actual dependency installation"""
         
-        # Quick check if dependency is already installed (optimization)
-        if self._is_dependency_installed(dep_name):
-            print(f"✅ {dep_name} is already installed, skipping...")
+        # Quick check if dependency is already installed (optimization). Packages
+        # the batch just installed still need their configuration steps.
+        if dep_name not in self._preinstalled_deps and self._is_dependency_installed(dep_name):
+            logger.info(f"✅ {dep_name} is already installed, skipping...")
             return True
 
         # Check if this is an external RDS database
@@ -357,6 +803,8 @@ echo "✅ Proceeding with installation"
             return self._install_docker(dep_config)
         elif dep_name == 'git':
             return self._install_git(dep_config)
+        elif dep_name == 'awscli':
+            return self._install_awscli(dep_config)
         elif dep_name == 'firewall':
             return self._configure_firewall(dep_config)
         elif dep_name == 'ssl_certificates':
@@ -364,9 +812,17 @@ echo "✅ Proceeding with installation"
         elif dep_name == 'monitoring':
             return self._install_monitoring_tools(dep_config)
         else:
-            print(f"⚠️  Unknown dependency: {dep_name}")
+            logger.warning(f"⚠️  Unknown dependency: {dep_name}")
             return False
     
+    def _run_install_script(self, script: str, timeout: int, live_output: bool = False) -> Tuple[bool, str]:
+        """Run an install script, keeping a failure's output for the retry decision"""
+        run = self.client.run_command_with_live_output if live_output else self.client.run_command
+        success, output = run(script, timeout=timeout)
+        if not success:
+            self._attempt.output = output
+        return success, output
+    
     def _install_apache(self, config: Dict[str, Any]) -> bool:
         """Install and configure Apache web server (OS-agnostic)"""
         version = config.get('version', 'latest')
@@ -374,88 +830,67 @@ echo "✅ Proceeding with installation"
         document_root = apache_config.get('document_root', '/var/www/html')
         
         # Get OS-specific package and service names
-        apache_packages = self.os_packages.get('apache', {}).get('packages', ['apache2'])
-        apache_service = self.os_packages.get('apache', {}).get('service', 'apache2')
+        apache_packages = self.os_packages['apache']['packages']
+        apache_service = self.os_packages['apache']['service']
         web_user = self.user_info['web_user']
         web_group = self.user_info['web_group']
         
-        print(f"🔧 Installing Apache web server on {self.os_type}...")
-        
-        # Step 1: Install Apache
-        print(f"\n📦 Step 1: Installing Apache packages: {', '.join(apache_packages)}")
-        install_cmd = f"{self.pkg_commands['install']} {' '.join(apache_packages)}"
-        success, output = self.client.run_command(install_cmd)
-        if not success:
-            return False
-        
-        # Step 2: Enable Apache service
-        print(f"\n🔧 Step 2: Enabling Apache service ({apache_service})")
-        enable_cmd = f"{self.svc_commands['enable']} {apache_service}"
-        success, output = self.client.run_command(enable_cmd)
-        if not success:
-            return False
-        
-        # Step 3: Create document root
-        print(f"\n📁 Step 3: Creating document root: {document_root}")
-        success, output = self.client.run_command(f"sudo mkdir -p {document_root}")
-        if not success:
-            return False
-        
-        # Step 4: Set ownership
-        print(f"\n🔐 Step 4: Setting proper ownership ({web_user}:{web_group})")
-        success, output = self.client.run_command(f"sudo chown -R {web_user}:{web_group} {document_root}")
-        if not success:
-            return False
-        
-        # Step 5: Set permissions
-        print("\n🔐 Step 5: Setting proper permissions")
-        success, output = self.client.run_command(f"sudo chmod -R 755 {document_root}")
-        if not success:
-            return False
+        logger.info(f"🔧 Installing Apache web server on {self.os_type}...")
         
-        # Step 6: Enable mod_rewrite if requested (Ubuntu/Debian specific)
+        # Optional steps; their failures are reported but not fatal
+        rewrite_step = ''
         if apache_config.get('enable_rewrite', True) and self.os_info['package_manager'] == 'apt':
-            print("\n🔧 Step 6: Enabling mod_rewrite")
-            success, output = self.client.run_command("sudo a2enmod rewrite")
-            if not success:
-                print("⚠️  mod_rewrite enable failed, but continuing...")
+            rewrite_step = '''
+echo "🔧 Step 3: Enabling mod_rewrite"
+sudo a2enmod rewrite || echo "⚠️  mod_rewrite enable failed, but continuing..."
+'''
         
-        # Step 7: Configure security settings (if config files exist)
+        security_step = ''
         if config.get('hide_version', True):
-            print("\n🔒 Step 7: Configuring security settings")
             if self.os_info['package_manager'] == 'apt':
                 # Ubuntu/Debian Apache config
-                security_script = '''
-echo "ServerTokens Prod" | sudo tee -a /etc/apache2/conf-available/security.conf
-echo "ServerSignature Off" | sudo tee -a /etc/apache2/conf-available/security.conf
+                security_step = '''
+echo "🔒 Step 4: Configuring security settings"
+printf 'ServerTokens Prod\\nServerSignature Off\\n' | sudo tee -a /etc/apache2/conf-available/security.conf \\
+    || echo "⚠️  Security configuration failed, but continuing..."
 sudo a2enconf security 2>/dev/null || true
 '''
             else:
                 # RHEL/CentOS/Amazon Linux Apache config
-                security_script = '''
-echo "ServerTokens Prod" | sudo tee -a /etc/httpd/conf/httpd.conf
-echo "ServerSignature Off" | sudo tee -a /etc/httpd/conf/httpd.conf
+                security_step = '''
+echo "🔒 Step 4: Configuring security settings"
+printf 'ServerTokens Prod\\nServerSignature Off\\n' | sudo tee -a /etc/httpd/conf/httpd.conf \\
+    || echo "⚠️  Security configuration failed, but continuing..."
+'''
+        
+        # All steps in one SSH session instead of a round trip per step
+        script = f'''
+set -e
+
+echo "📦 Step 1: Installing Apache packages: {', '.join(apache_packages)}"
+{self._package_install_command(apache_packages, config)}
+
+echo "📁 Step 2: Setting up document root {document_root} ({web_user}:{web_group}, 755)"
+if [ -d {document_root} ]; then
+    # Existing content gets the same ownership and permissions
+    sudo chown -R {web_user}:{web_group} {document_root}
+    sudo chmod -R 755 {document_root}
+else
+    sudo install -d -o {web_user} -g {web_group} -m 0755 {document_root}
+fi
+{rewrite_step}{security_step}
+echo "🚀 Step 5: Enabling and starting Apache service ({apache_service})"
+{self.svc_commands['enable_now']} {apache_service}
+
+echo "🔄 Step 6: Reloading Apache configuration"
+{self.svc_commands['reload_or_restart']} {apache_service}
 '''
-            
-            success, output = self.client.run_command(security_script)
-            if not success:
-                print("⚠️  Security configuration failed, but continuing...")
-        
-        # Step 8: Start Apache
-        print(f"\n🚀 Step 8: Starting Apache service ({apache_service})")
-        start_cmd = f"{self.svc_commands['start']} {apache_service}"
-        success, output = self.client.run_command(start_cmd)
-        if not success:
-            return False
         
-        # Step 9: Reload Apache
-        print(f"\n🔄 Step 9: Reloading Apache configuration")
-        reload_cmd = f"{self.svc_commands['restart']} {apache_service}"
-        success, output = self.client.run_command(reload_cmd)
+        success, output = self._run_install_script(script, timeout=420, live_output=True)
         if not success:
             return False
         
-        print(f"\n✅ Apache installation completed successfully on {self.os_type}!")
+        logger.info(f"\n✅ Apache installation completed successfully on {self.os_type}!")
         return True
     
     def _install_nginx(self, config: Dict[str, Any]) -> bool:
@@ -464,8 +899,8 @@ echo "ServerSignature Off" | sudo tee -a /etc/httpd/conf/httpd.conf
         document_root = nginx_config.get('document_root', '/var/www/html')
         
         # Get OS-specific package and service names
-        nginx_packages = self.os_packages.get('nginx', {}).get('packages', ['nginx'])
-        nginx_service = self.os_packages.get('nginx', {}).get('service', 'nginx')
+        nginx_packages = self.os_packages['nginx']['packages']
+        nginx_service = self.os_packages['nginx']['service']
         web_user = self.user_info['web_user']
         web_group = self.user_info['web_group']
         
@@ -474,24 +909,25 @@ set -e
 echo "Installing Nginx web server on {self.os_type}..."
 
 # Install Nginx
-{self.pkg_commands['install']} {' '.join(nginx_packages)}
-
-# Enable Nginx to start on boot
-{self.svc_commands['enable']} {nginx_service}
+{self._package_install_command(nginx_packages, config)}
 
 # Configure document root
 DOCUMENT_ROOT="{document_root}"
-sudo mkdir -p "$DOCUMENT_ROOT"
-sudo chown -R {web_user}:{web_group} "$DOCUMENT_ROOT"
-sudo chmod -R 755 "$DOCUMENT_ROOT"
+if [ -d "$DOCUMENT_ROOT" ]; then
+    # Existing content gets the same ownership and permissions
+    sudo chown -R {web_user}:{web_group} "$DOCUMENT_ROOT"
+    sudo chmod -R 755 "$DOCUMENT_ROOT"
+else
+    sudo install -d -o {web_user} -g {web_group} -m 0755 "$DOCUMENT_ROOT"
+fi
 
-# Start Nginx
-{self.svc_commands['start']} {nginx_service}
+# Enable Nginx to start on boot and start it
+{self.svc_commands['enable_now']} {nginx_service}
 
 echo "✅ Nginx installation completed on {self.os_type}"
 '''
         
-        success, output = self.client.run_command(script, timeout=420)
+        success, output = self._run_install_script(script, timeout=420, live_output=True)
         return success
     
     def _install_mysql(self, config: Dict[str, Any]) -> bool:
@@ -502,11 +938,11 @@ echo "✅ Nginx installation completed on {self.os_type}"
         mysql_config = config.get('config', {})
         
         # Get OS-specific package and service names
-        mysql_packages = self.os_packages.get('mysql_server', {}).get('packages', ['mysql-server'])
-        mysql_service = self.os_packages.get('mysql_server', {}).get('service', 'mysql')
+        mysql_packages = self.os_packages['mysql_server']['packages']
+        mysql_service = self.os_packages['mysql_server']['service']
         
-        print(f"📦 Installing local MySQL database server on {self.os_type}...")
-        print("⚠️  Note: For external RDS databases, only the MySQL client will be installed")
+        logger.info(f"📦 Installing local MySQL database server on {self.os_type}...")
+        logger.info("⚠️  Note: For external RDS databases, only the MySQL client will be installed")
         
         if self.os_info['package_manager'] == 'apt':
             script = f'''
@@ -517,13 +953,10 @@ echo "Installing MySQL database server on Ubuntu/Debian..."
 export DEBIAN_FRONTEND=noninteractive
 
 # Install MySQL
-{self.pkg_commands['install']} {' '.join(mysql_packages)}
+{self._package_install_command(mysql_packages, config)}
 
-# Enable MySQL to start on boot
-{self.svc_commands['enable']} {mysql_service}
-
-# Start MySQL
-{self.svc_commands['start']} {mysql_service}
+# Enable MySQL to start on boot and start it
+{self.svc_commands['enable_now']} {mysql_service}
 
 # Secure MySQL installation (basic)
 sudo mysql -e "ALTER USER 'root'@'localhost' IDENTIFIED WITH mysql_native_password BY 'root123';" || true
@@ -544,13 +977,10 @@ set -e
 echo "Installing MySQL database server on RHEL/CentOS/Amazon Linux..."
 
 # Install MySQL
-{self.pkg_commands['install']} {' '.join(mysql_packages)}
-
-# Enable MySQL to start on boot
-{self.svc_commands['enable']} {mysql_service}
+{self._package_install_command(mysql_packages, config)}
 
-# Start MySQL
-{self.svc_commands['start']} {mysql_service}
+# Enable MySQL to start on boot and start it
+{self.svc_commands['enable_now']} {mysql_service}
 
 # Secure MySQL installation (basic) - different service name on RHEL systems
 sudo mysql -e "ALTER USER 'root'@'localhost' IDENTIFIED WITH mysql_native_password BY 'root123';" || true
@@ -565,7 +995,7 @@ fi
 echo "✅ MySQL installation completed on RHEL/CentOS/Amazon Linux"
 '''
         
-        success, output = self.client.run_command_with_live_output(script, timeout=300)
+        success, output = self._run_install_script(script, timeout=300, live_output=True)
         return success
     
     def _install_postgresql(self, config: Dict[str, Any]) -> bool:
@@ -576,24 +1006,21 @@ echo "✅ MySQL installation completed on RHEL/CentOS/Amazon Linux"
         pg_config = config.get('config', {})
         
         # Get OS-specific package and service names
-        pg_packages = self.os_packages.get('postgresql_server', {}).get('packages', ['postgresql', 'postgresql-contrib'])
-        pg_service = self.os_packages.get('postgresql_server', {}).get('service', 'postgresql')
+        pg_packages = self.os_packages['postgresql_server']['packages']
+        pg_service = self.os_packages['postgresql_server']['service']
         
-        print(f"📦 Installing local PostgreSQL database server on {self.os_type}...")
-        print("⚠️  Note: For external RDS databases, only the PostgreSQL client will be installed")
+        logger.info(f"📦 Installing local PostgreSQL database server on {self.os_type}...")
+        logger.info("⚠️  Note: For external RDS databases, only the PostgreSQL client will be installed")
         
         script = f'''
 set -e
 echo "Installing PostgreSQL database server on {self.os_type}..."
 
 # Install PostgreSQL
-{self.pkg_commands['install']} {' '.join(pg_packages)}
+{self._package_install_command(pg_packages, config)}
 
-# Enable PostgreSQL to start on boot
-{self.svc_commands['enable']} {pg_service}
-
-# Start PostgreSQL
-{self.svc_commands['start']} {pg_service}
+# Enable PostgreSQL to start on boot and start it
+{self.svc_commands['enable_now']} {pg_service}
 
 # Create application database if requested
 if [ "{pg_config.get('create_app_database', True)}" = "True" ]; then
@@ -605,7 +1032,7 @@ fi
 echo "✅ PostgreSQL installation completed on {self.os_type}"
 '''
         
-        success, output = self.client.run_command(script, timeout=300)
+        success, output = self._run_install_script(script, timeout=300, live_output=True)
         return success
     
     def _install_php(self, config: Dict[str, Any]) -> bool:
@@ -615,40 +1042,20 @@ echo "✅ PostgreSQL installation completed on {self.os_type}"
         extensions = php_config.get('extensions', ['pdo', 'pdo_mysql'])
         
         # Get OS-specific package and service names
-        php_packages = self.os_packages.get('php', {}).get('packages', ['php', 'php-fpm'])
-        php_service = self.os_packages.get('php', {}).get('service', 'php8.1-fpm')
-        apache_service = self.os_packages.get('apache', {}).get('service', 'apache2')
-        
-        # Build extension list based on OS
-        ext_packages = []
-        for ext in extensions:
-            # Skip 'pdo' as it's built into PHP (part of php-common)
-            if ext == 'pdo':
-                continue  # PDO is included in php-common, no separate package
-            elif ext == 'pdo_mysql' or ext == 'mysql':
-                if self.os_info['package_manager'] == 'apt':
-                    ext_packages.extend(['php-mysql', f'php{version}-mysql'])
-                else:
-                    ext_packages.append('php-mysqlnd')
-            elif ext == 'pdo_pgsql' or ext == 'pgsql':
-                if self.os_info['package_manager'] == 'apt':
-                    ext_packages.extend(['php-pgsql', f'php{version}-pgsql'])
-                else:
-                    ext_packages.append('php-pgsql')
-            elif ext == 'redis':
-                if self.os_info['package_manager'] == 'apt':
-                    ext_packages.extend(['php-redis', f'php{version}-redis'])
-                else:
-                    ext_packages.append('php-redis')
-            elif ext == 'json':
-                continue  # JSON is built into PHP 8.0+, no separate package needed
-            else:
-                if self.os_info['package_manager'] == 'apt':
-                    ext_packages.append(f'php-{ext}')
-                else:
-                    ext_packages.append(f'php-{ext}')
+        php_packages = self.os_packages['php']['packages']
+        php_service = self.os_packages['php']['service']
+        apache_service = self.os_packages['apache']['service']
         
-        ext_list = ' '.join(ext_packages) if ext_packages else ''
+        # Build extension list based on OS; extensions that share packages
+        # (pdo_mysql and mysql, say) are listed once
+        package_manager = 'apt' if self.os_info['package_manager'] == 'apt' else 'yum'
+        ext_packages = list(dict.fromkeys(
+            package.format(version=version)
+            for ext in extensions if ext not in self.PHP_BUILTIN_EXTENSIONS
+            for package in self.PHP_EXTENSION_PACKAGES.get((ext, package_manager), (f'php-{ext}',))
+        ))
+        
+        ext_list = shlex.join(ext_packages)
         
         if self.os_info['package_manager'] == 'apt':
             script = f'''
@@ -658,16 +1065,16 @@ echo "Installing PHP {version} on Ubuntu/Debian..."
 # Add Ondrej PPA for PHP (required for PHP 8.1+ on Ubuntu 22.04)
 if ! grep -q "ondrej/php" /etc/apt/sources.list /etc/apt/sources.list.d/* 2>/dev/null; then
     echo "Adding Ondrej PHP PPA..."
-    {self.pkg_commands['install']} software-properties-common
-    sudo add-apt-repository -y ppa:ondrej/php
-    {self.pkg_commands['update']}
+    {self._install_command(config)} software-properties-common
+    # add-apt-repository refreshes the package lists itself
+    sudo flock {self.APT_LISTS_LOCK} add-apt-repository -y ppa:ondrej/php
     echo "✅ Ondrej PHP PPA added"
 else
     echo "✅ Ondrej PHP PPA already present"
 fi
 
-# Install PHP and extensions
-{self.pkg_commands['install']} php{version} php{version}-fpm {ext_list}
+# Install PHP and extensions (OPcache is only a recommended package, so name it)
+{self._install_command(config)} php{version} php{version}-fpm php{version}-opcache {ext_list}
 
 # Install Composer if requested
 if [ "{php_config.get('enable_composer', True)}" = "True" ]; then
@@ -679,7 +1086,7 @@ fi
 
 # Configure PHP-FPM if Apache is also enabled
 if {self.svc_commands['is_active']} {apache_service}; then
-    {self.pkg_commands['install']} libapache2-mod-php{version}
+    {self._install_command(config)} libapache2-mod-php{version}
     sudo a2enmod php{version}
     {self.svc_commands['reload']} {apache_service}
 fi
@@ -694,11 +1101,11 @@ echo "Installing PHP {version} on RHEL/CentOS/Amazon Linux..."
 
 # Enable EPEL and Remi repositories for PHP
 if ! rpm -q epel-release >/dev/null 2>&1; then
-    {self.pkg_commands['install']} epel-release
+    {self._install_command(config)} epel-release
 fi
 
 # Install PHP and extensions
-{self.pkg_commands['install']} php php-fpm {ext_list}
+{self._install_command(config)} php php-fpm {ext_list}
 
 # Install Composer if requested
 if [ "{php_config.get('enable_composer', True)}" = "True" ]; then
@@ -716,7 +1123,7 @@ fi
 echo "✅ PHP installation completed on RHEL/CentOS/Amazon Linux"
 '''
         
-        success, output = self.client.run_command(script, timeout=300)
+        success, output = self._run_install_script(script, timeout=300, live_output=True)
         return success
     
     def _install_python(self, config: Dict[str, Any]) -> bool:
@@ -725,7 +1132,7 @@ echo "✅ PHP installation completed on RHEL/CentOS/Amazon Linux"
         python_config = config.get('config', {})
         
         # Get OS-specific package names
-        python_packages = self.os_packages.get('python', {}).get('packages', ['python3', 'python3-pip'])
+        python_packages = self.os_packages['python']['packages']
         web_user = self.user_info['web_user']
         web_group = self.user_info['web_group']
         
@@ -738,12 +1145,12 @@ echo "Installing Python {version} on Ubuntu/Debian..."
 # For Ubuntu 22.04, python3 is already installed, just install additional tools
 if [ "{version}" = "3.10" ] || [ "{version}" = "3" ]; then
     # Use system Python3 - install version-specific venv package
-    {self.pkg_commands['install']} python3 python3-pip python3-dev python3.10-venv
+    {self._install_command(config)} python3 python3-pip python3-dev python3.10-venv
 else
     # Try to install specific version
-    {self.pkg_commands['install']} python{version} python{version}-pip python{version}-venv python{version}-dev || {{
+    {self._install_command(config)} python{version} python{version}-pip python{version}-venv python{version}-dev || {{
         echo "⚠️  Python {version} not available, using system python3"
-        {self.pkg_commands['install']} python3 python3-pip python3-dev python3.10-venv
+        {self._install_command(config)} python3 python3-pip python3-dev python3.10-venv
     }}
 fi
 
@@ -768,7 +1175,7 @@ set -e
 echo "Installing Python {version} on RHEL/CentOS/Amazon Linux..."
 
 # Install Python and pip
-{self.pkg_commands['install']} {' '.join(python_packages)}
+{self._install_command(config)} {shlex.join(python_packages)}
 
 # Create virtual environment if requested
 if [ "{python_config.get('virtual_env', True)}" = "True" ]; then
@@ -781,30 +1188,42 @@ fi
 echo "✅ Python installation completed on RHEL/CentOS/Amazon Linux"
 '''
         
-        success, output = self.client.run_command(script, timeout=300)
+        success, output = self._run_install_script(script, timeout=300, live_output=True)
         
         # Install pip packages if specified
         pip_packages = python_config.get('pip_packages', [])
         if pip_packages and success:
+            # Quoted once: specifiers like requests>=2.31 would otherwise be shell redirections
+            pip_list = shlex.join(pip_packages)
             pip_script = f'''
 set -e
-echo "Installing Python packages: {' '.join(pip_packages)}"
+echo "Installing Python packages: {pip_list}"
 
 if [ -d "/opt/python-venv/app" ]; then
-    source /opt/python-venv/app/bin/activate
-    pip install --upgrade pip
-    pip install {' '.join(pip_packages)}
+    # uv resolves and downloads in parallel; its cache is kept across deploys
+    if ! command -v uv > /dev/null 2>&1; then
+        curl -LsSf https://astral.sh/uv/install.sh | sudo env UV_INSTALL_DIR=/usr/local/bin UV_NO_MODIFY_PATH=1 sh > /dev/null 2>&1 \\
+            || echo "⚠️  uv installation failed, falling back to pip"
+    fi
+    sudo mkdir -p /var/cache/uv
+    if command -v uv > /dev/null 2>&1 && sudo UV_CACHE_DIR=/var/cache/uv uv pip install --python /opt/python-venv/app/bin/python {pip_list}; then
+        sudo chown -R {web_user}:{web_group} /opt/python-venv
+    else
+        source /opt/python-venv/app/bin/activate
+        pip install --upgrade pip
+        pip install {pip_list}
+    fi
 else
     if [ "{version}" = "3.10" ] || [ "{version}" = "3" ]; then
-        sudo pip3 install {' '.join(pip_packages)}
+        sudo pip3 install {pip_list}
     else
-        sudo pip{version} install {' '.join(pip_packages)} || sudo pip3 install {' '.join(pip_packages)}
+        sudo pip{version} install {pip_list} || sudo pip3 install {pip_list}
     fi
 fi
 
 echo "✅ Python packages installed"
 '''
-            success, output = self.client.run_command(pip_script, timeout=420)
+            success, output = self._run_install_script(pip_script, timeout=420, live_output=True)
         
         return success
     
@@ -819,15 +1238,16 @@ set -e
 echo "Installing Node.js {version} on Ubuntu/Debian..."
 
 # Install Node.js via NodeSource repository
-curl -fsSL https://deb.nodesource.com/setup_{version}.x | sudo -E bash -
-{self.pkg_commands['install']} nodejs
+# (the setup script runs apt-get update, so it takes the list lock)
+curl -fsSL https://deb.nodesource.com/setup_{version}.x | sudo -E flock {self.APT_LISTS_LOCK} bash -
+{self._install_command(config)} nodejs
 
 # Install Yarn if requested
 if [ "{node_config.get('package_manager', 'npm')}" = "yarn" ]; then
     curl -sS https://dl.yarnpkg.com/debian/pubkey.gpg | sudo apt-key add -
     echo "deb https://dl.yarnpkg.com/debian/ stable main" | sudo tee /etc/apt/sources.list.d/yarn.list
-    {self.pkg_commands['update']}
-    {self.pkg_commands['install']} yarn
+    {self._apt_update_source('yarn.list')}
+    {self._install_command(config)} yarn
 fi
 
 echo "✅ Node.js {version} installation completed on Ubuntu/Debian"
@@ -840,78 +1260,63 @@ echo "Installing Node.js {version} on RHEL/CentOS/Amazon Linux..."
 
 # Install Node.js via NodeSource repository
 curl -fsSL https://rpm.nodesource.com/setup_{version}.x | sudo bash -
-{self.pkg_commands['install']} nodejs
+{self._install_command(config)} nodejs
 
 # Install Yarn if requested
 if [ "{node_config.get('package_manager', 'npm')}" = "yarn" ]; then
     curl -sL https://dl.yarnpkg.com/rpm/yarn.repo | sudo tee /etc/yum.repos.d/yarn.repo
-    {self.pkg_commands['install']} yarn
+    {self._install_command(config)} yarn
 fi
 
 echo "✅ Node.js {version} installation completed on RHEL/CentOS/Amazon Linux"
 '''
         
-        success, output = self.client.run_command(script, timeout=300)
+        success, output = self._run_install_script(script, timeout=300, live_output=True)
         
         # Install npm packages if specified
         npm_packages = node_config.get('npm_packages', [])
         if npm_packages and success:
             pkg_manager = node_config.get('package_manager', 'npm')
+            npm_list = shlex.join(npm_packages)
             npm_script = f'''
 set -e
-echo "Installing Node.js packages: {' '.join(npm_packages)}"
-sudo {pkg_manager} install -g {' '.join(npm_packages)}
+echo "Installing Node.js packages: {npm_list}"
+sudo {pkg_manager} install -g {npm_list}
 echo "✅ Node.js packages installed"
 '''
-            success, output = self.client.run_command(npm_script, timeout=420)
+            success, output = self._run_install_script(npm_script, timeout=420, live_output=True)
         
         return success
     
     def _install_redis(self, config: Dict[str, Any]) -> bool:
         """Install and configure Redis (OS-agnostic)"""
         # Get OS-specific package and service names
-        redis_packages = self.os_packages.get('redis', {}).get('packages', ['redis-server'])
-        redis_service = self.os_packages.get('redis', {}).get('service', 'redis-server')
-        
-        script = f'''
-set -e
-echo "Installing Redis on {self.os_type}..."
-
-# Install Redis
-{self.pkg_commands['install']} {' '.join(redis_packages)}
-
-# Enable Redis to start on boot
-{self.svc_commands['enable']} {redis_service}
-
-# Start Redis
-{self.svc_commands['start']} {redis_service}
-
-echo "✅ Redis installation completed on {self.os_type}"
-'''
-        
-        success, output = self.client.run_command(script, timeout=420)
+        redis_packages = self.os_packages['redis']['packages']
+        redis_service = self.os_packages['redis']['service']
+        
+        script = SERVICE_INSTALL_SCRIPT.format(
+            name='Redis',
+            on_os=f' on {self.os_type}',
+            install_command=self._package_install_command(redis_packages, config),
+            enable_now=self.svc_commands['enable_now'],
+            service=redis_service,
+        )
+        
+        success, output = self._run_install_script(script, timeout=420)
         return success
     
     def _install_memcached(self, config: Dict[str, Any]) -> bool:
         """Install and configure Memcached"""
-        script = '''
-set -e
-echo "Installing Memcached..."
-
-# Install Memcached
-# sudo apt-get update  # Removed: apt-get update now runs once at start
-sudo apt-get install -y memcached
-
-# Enable Memcached to start on boot
-sudo systemctl enable memcached
-
-# Start Memcached
-sudo systemctl start memcached
-
-echo "✅ Memcached installation completed"
-'''
-        
-        success, output = self.client.run_command(script, timeout=420)
+        # apt-get update already ran once at the start of the install
+        script = SERVICE_INSTALL_SCRIPT.format(
+            name='Memcached',
+            on_os='',
+            install_command=self._package_install_command(self._apt_installer_packages('memcached'), config),
+            enable_now='sudo systemctl enable --now',
+            service='memcached',
+        )
+        
+        success, output = self._run_install_script(script, timeout=420)
         return success
     
     def _install_docker(self, config: Dict[str, Any]) -> bool:
@@ -922,11 +1327,16 @@ echo "✅ Memcached installation completed"
 set -e
 echo "🐳 Installing Docker (optimized method)..."
 
-# Remove old versions quickly
-sudo apt-get remove -y docker docker-engine docker.io containerd runc 2>/dev/null || true
+# Remove old versions, only when one is actually installed
+OLD_PACKAGES=$(dpkg-query -W -f='${{Status}} ${{Package}}\\n' docker docker-engine docker.io containerd runc 2>/dev/null | awk '/ installed /{{print $4}}')
+if [ -n "$OLD_PACKAGES" ]; then
+    sudo apt-get remove -y $OLD_PACKAGES
+fi
 
-# Install prerequisites (minimal set)
-sudo apt-get install -y ca-certificates curl gnupg lsb-release
+# Install prerequisites (minimal set; usually already on the image)
+if ! dpkg -s ca-certificates curl gnupg lsb-release > /dev/null 2>&1; then
+    sudo apt-get install -y ca-certificates curl gnupg lsb-release
+fi
 
 # Add Docker GPG key (faster method)
 sudo install -m 0755 -d /etc/apt/keyrings
@@ -937,12 +1347,11 @@ sudo chmod a+r /etc/apt/keyrings/docker.gpg
 echo "deb [arch=$(dpkg --print-architecture) signed-by=/etc/apt/keyrings/docker.gpg] https://download.docker.com/linux/ubuntu $(lsb_release -cs) stable" | sudo tee /etc/apt/sources.list.d/docker.list > /dev/null
 
 # Update and install Docker (with compose plugin)
-sudo apt-get update
+{self._apt_update_source('docker.list')}
 sudo apt-get install -y docker-ce docker-ce-cli containerd.io docker-buildx-plugin docker-compose-plugin
 
 # Start and enable Docker
-sudo systemctl start docker
-sudo systemctl enable docker
+{self.svc_commands['enable_now']} docker
 
 # Verify installation
 docker --version
@@ -951,7 +1360,7 @@ docker compose version
 echo "✅ Docker installation completed"
 '''
         
-        success, output = self.client.run_command(script, timeout=240)
+        success, output = self._run_install_script(script, timeout=240)
         return success
     
     def _install_git(self, config: Dict[str, Any]) -> bool:
@@ -959,26 +1368,26 @@ echo "✅ Docker installation completed"
         git_config = config.get('config', {})
         
         # Get OS-specific package names
-        git_packages = self.os_packages.get('git', {}).get('packages', ['git'])
+        git_packages = self.os_packages['git']['packages']
         
         script = f'''
 set -e
 echo "Installing Git on {self.os_type}..."
 
 # Install Git
-{self.pkg_commands['install']} {' '.join(git_packages)}
+{self._package_install_command(git_packages, config)}
 
 # Install Git LFS if requested (Ubuntu/Debian only for now)
 if [ "{git_config.get('install_lfs', False)}" = "True" ] && [ "{self.os_info['package_manager']}" = "apt" ]; then
-    curl -s https://packagecloud.io/install/repositories/github/git-lfs/script.deb.sh | sudo bash
-    {self.pkg_commands['install']} git-lfs
+    curl -s https://packagecloud.io/install/repositories/github/git-lfs/script.deb.sh | sudo flock {self.APT_LISTS_LOCK} bash
+    {self._install_command(config)} git-lfs
     echo "✅ Git LFS installed"
 fi
 
 echo "✅ Git installation completed on {self.os_type}"
 '''
         
-        success, output = self.client.run_command(script, timeout=420)
+        success, output = self._run_install_script(script, timeout=420)
         return success
     
     def _install_awscli(self, config: Dict[str, Any]) -> bool:
@@ -987,14 +1396,14 @@ echo "✅ Git installation completed on {self.os_type}"
         version = awscli_config.get('version', '2')
         
         if version == '2':
-            script = '''
+            script = f'''
 set -e
 echo "Installing AWS CLI v2..."
 
 # Download and install AWS CLI v2
 cd /tmp
 curl -s "https://awscli.amazonaws.com/awscli-exe-linux-x86_64.zip" -o "awscliv2.zip"
-sudo apt-get install -y unzip
+{self._package_install_command(self._apt_installer_packages('awscli'), config)}
 unzip -q awscliv2.zip
 sudo ./aws/install --update
 rm -rf aws awscliv2.zip
@@ -1006,12 +1415,12 @@ echo "✅ AWS CLI v2 installation completed"
 '''
         else:
             # AWS CLI v1 (legacy)
-            script = '''
+            script = f'''
 set -e
 echo "Installing AWS CLI v1..."
 
 # Install AWS CLI v1 via apt
-sudo apt-get install -y awscli
+{self._package_install_command(self._apt_installer_packages('awscli'), config)}
 
 # Verify installation
 aws --version
@@ -1019,7 +1428,7 @@ aws --version
 echo "✅ AWS CLI v1 installation completed"
 '''
         
-        success, output = self.client.run_command(script, timeout=300)
+        success, output = self._run_install_script(script, timeout=300)
         return success
     
     def _configure_firewall(self, config: Dict[str, Any]) -> bool:
@@ -1032,8 +1441,8 @@ echo "✅ AWS CLI v1 installation completed"
             allowed_ports.insert(0, '22')
         
         # Get OS-specific firewall packages
-        firewall_packages = self.os_packages.get('firewall', {}).get('packages', ['ufw'])
-        firewall_service = self.os_packages.get('firewall', {}).get('service', 'ufw')
+        firewall_packages = self.os_packages['firewall']['packages']
+        firewall_service = self.os_packages['firewall']['service']
         
         if self.os_info['package_manager'] == 'apt':
             # Ubuntu/Debian uses UFW
@@ -1044,7 +1453,7 @@ echo "Configuring UFW firewall on Ubuntu/Debian..."
 # Check if UFW is already installed
 if ! command -v ufw &> /dev/null; then
     echo "Installing UFW..."
-    {self.pkg_commands['install']} {' '.join(firewall_packages)}
+    {self._package_install_command(firewall_packages, config)}
 else
     echo "UFW already installed"
 fi
@@ -1061,12 +1470,21 @@ sudo ufw default allow outgoing
 
 # CRITICAL: Allow SSH first to prevent lockout
 sudo ufw allow 22/tcp
-
+'''
+            # Skip 22 since we already added it
+            other_ports = [str(port) for port in allowed_ports if str(port) != '22']
+            if other_ports:
+                # One application profile covers every other port, so ufw runs once
+                script += f'''
 # Allow other specified ports
+sudo tee /etc/ufw/applications.d/deployment-app > /dev/null << 'EOF'
+[DeploymentApp]
+title=Deployment application
+description=Ports allowed by the deployment configuration
+ports={'|'.join(other_ports)}
+EOF
+sudo ufw allow DeploymentApp
 '''
-            for port in allowed_ports:
-                if str(port) != '22':  # Skip 22 since we already added it
-                    script += f'sudo ufw allow {port}\n'
             
             script += '''
 # Enable UFW
@@ -1086,17 +1504,15 @@ echo "Configuring firewalld on RHEL/CentOS/Amazon Linux..."
 # Install firewalld if not present
 if ! command -v firewall-cmd &> /dev/null; then
     echo "Installing firewalld..."
-    {self.pkg_commands['install']} firewalld
+    {self._install_command(config)} firewalld
 fi
 
 # Enable and start firewalld
-{self.svc_commands['enable']} firewalld
-{self.svc_commands['start']} firewalld
+{self.svc_commands['enable_now']} firewalld
 
 # Allow specified ports
+sudo firewall-cmd --permanent {' '.join(f'--add-port={port}/tcp' for port in allowed_ports)}
 '''
-            for port in allowed_ports:
-                script += f'sudo firewall-cmd --permanent --add-port={port}/tcp\n'
             
             script += '''
 # Reload firewall rules
@@ -1108,7 +1524,7 @@ sudo firewall-cmd --list-ports | grep 22 || echo "⚠️  Warning: SSH port may
 echo "✅ firewalld configuration completed"
 '''
         
-        success, output = self.client.run_command(script, timeout=120)
+        success, output = self._run_install_script(script, timeout=120)
         return success
     
     def _install_ssl_certificates(self, config: Dict[str, Any]) -> bool:
@@ -1117,22 +1533,21 @@ echo "✅ firewalld configuration completed"
         provider = ssl_config.get('provider', 'letsencrypt')
         
         if provider == 'letsencrypt':
-            script = '''
+            script = f'''
 set -e
 echo "Installing Certbot for Let's Encrypt..."
 
 # Install Certbot
-# sudo apt-get update  # Removed: apt-get update now runs once at start
-sudo apt-get install -y certbot python3-certbot-apache
+{self._package_install_command(self._apt_installer_packages('ssl_certificates'), config)}
 
 echo "✅ Certbot installation completed"
 echo "ℹ️  Run 'sudo certbot --apache' to obtain SSL certificates"
 '''
         else:
-            print(f"⚠️  SSL provider '{provider}' not implemented")
+            logger.warning(f"⚠️  SSL provider '{provider}' not implemented")
             return True  # Don't fail deployment for this
         
-        success, output = self.client.run_command(script, timeout=420)
+        success, output = self._run_install_script(script, timeout=420)
         return success
     
     def _install_monitoring_tools(self, config: Dict[str, Any]) -> bool:
@@ -1145,18 +1560,17 @@ set -e
 echo "Installing monitoring tools..."
 
 # Install monitoring tools
-# sudo apt-get update  # Removed: apt-get update now runs once at start
-sudo apt-get install -y {' '.join(tools)}
+{self._package_install_command(tools, config)}
 
 echo "✅ Monitoring tools installation completed"
 '''
         
-        success, output = self.client.run_command(script, timeout=420)
+        success, output = self._run_install_script(script, timeout=420)
         return success
     
     def configure_services(self) -> bool:
         """Configure installed services"""
-        print("🔧 Configuring installed services...")
+        logger.info("🔧 Configuring installed services...")
         
         success = True
         
@@ -1190,6 +1604,12 @@ echo "✅ Monitoring tools installation completed"
             apache_conf_dir = '/etc/httpd'
             apache_log_dir = '/var/log/httpd'
         
+        index_html = _load_template('deploy_index.html').substitute(
+            OS_NAME=self.os_type.replace('_', ' ').title(),
+            WEB_USER=web_user,
+            WEB_GROUP=web_group,
+        )
+        
         script = f'''
 set -e
 echo "Configuring web server on {self.os_type}..."
@@ -1204,111 +1624,7 @@ sudo rm -f /var/www/html/index.nginx-debian.html
 
 # Create a proper index.html for testing
 cat > /tmp/index.html << 'EOF'
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Application Deployed Successfully</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            margin: 0;
-            padding: 40px;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            min-height: 100vh;
-        }}
-        .container {{
-            max-width: 800px;
-            margin: 0 auto;
-            background: rgba(255, 255, 255, 0.1);
-            padding: 40px;
-            border-radius: 15px;
-            backdrop-filter: blur(10px);
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.1);
-        }}
-        .success {{
-            color: #4ade80;
-            font-size: 2.5em;
-            margin-bottom: 20px;
-            text-align: center;
-        }}
-        .info {{
-            background: rgba(255, 255, 255, 0.1);
-            padding: 20px;
-            border-radius: 10px;
-            margin: 20px 0;
-        }}
-        .info h3 {{
-            margin-top: 0;
-            color: #fbbf24;
-        }}
-        .status-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin: 20px 0;
-        }}
-        .status-item {{
-            background: rgba(255, 255, 255, 0.1);
-            padding: 15px;
-            border-radius: 8px;
-            text-align: center;
-        }}
-        .status-item strong {{
-            display: block;
-            color: #fbbf24;
-            margin-bottom: 5px;
-        }}
-        .footer {{
-            text-align: center;
-            margin-top: 30px;
-            opacity: 0.8;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="success">✅ Deployment Successful!</div>
-        
-        <div class="info">
-            <h3>🚀 Your Application is Live</h3>
-            <p>The web server has been successfully configured and is now serving your application.</p>
-        </div>
-        
-        <div class="status-grid">
-            <div class="status-item">
-                <strong>Server</strong>
-                Apache on {self.os_type.replace('_', ' ').title()}
-            </div>
-            <div class="status-item">
-                <strong>Document Root</strong>
-                /var/www/html
-            </div>
-            <div class="status-item">
-                <strong>Web User</strong>
-                {web_user}:{web_group}
-            </div>
-            <div class="status-item">
-                <strong>Status</strong>
-                🟢 Online
-            </div>
-        </div>
-        
-        <div class="info">
-            <h3>📁 Next Steps</h3>
-            <p>You can now upload your application files to <code>/var/www/html</code> to replace this default page.</p>
-            <p>The web server is configured with proper permissions and security settings.</p>
-        </div>
-        
-        <div class="footer">
-            <p>Deployed via GitHub Actions • Amazon Lightsail</p>
-        </div>
-    </div>
-</body>
-</html>
-EOF
+{index_html}EOF
 
 sudo mv /tmp/index.html /var/www/html/index.html
 sudo chown {web_user}:{web_group} /var/www/html/index.html
@@ -1367,9 +1683,9 @@ echo "✅ Web server configuration completed on {self.os_type}"
     def _configure_mysql_app_access(self) -> bool:
         """Configure MySQL for application access"""
         # Skip configuration if using external RDS database
-        mysql_config = self.config.get('dependencies', {}).get('mysql', {})
+        mysql_config = self._dep_cfg.get('mysql', {})
         if mysql_config.get('external', False):
-            print("ℹ️  Skipping local MySQL configuration (using external RDS)")
+            logger.info("ℹ️  Skipping local MySQL configuration (using external RDS)")
             return True
         
         script = '''
@@ -1391,9 +1707,9 @@ echo "✅ MySQL application access configured"
     def _configure_postgresql_app_access(self) -> bool:
         """Configure PostgreSQL for application access"""
         # Skip configuration if using external RDS database
-        pg_config = self.config.get('dependencies', {}).get('postgresql', {})
+        pg_config = self._dep_cfg.get('postgresql', {})
         if pg_config.get('external', False):
-            print("ℹ️  Skipping local PostgreSQL configuration (using external RDS)")
+            logger.info("ℹ️  Skipping local PostgreSQL configuration (using external RDS)")
             return True
         
         script = '''
@@ -1412,52 +1728,70 @@ echo "✅ PostgreSQL application access configured"
     
     def restart_services(self) -> bool:
         """Restart all installed services (OS-agnostic)"""
-        print(f"🔄 Restarting installed services on {self.os_type}...")
+        logger.info(f"🔄 Restarting installed services on {self.os_type}...")
         
         # Get OS-specific service names
         service_map = {
-            'apache': self.os_packages.get('apache', {}).get('service', 'apache2'),
-            'nginx': self.os_packages.get('nginx', {}).get('service', 'nginx'),
-            'mysql': self.os_packages.get('mysql_server', {}).get('service', 'mysql'),
-            'postgresql': self.os_packages.get('postgresql_server', {}).get('service', 'postgresql'),
-            'redis': self.os_packages.get('redis', {}).get('service', 'redis-server'),
+            'apache': self.os_packages['apache']['service'],
+            'nginx': self.os_packages['nginx']['service'],
+            'mysql': self.os_packages['mysql_server']['service'],
+            'postgresql': self.os_packages['postgresql_server']['service'],
+            'redis': self.os_packages['redis']['service'],
             'memcached': 'memcached',
             'docker': 'docker',
             'nodejs': 'nodejs-app'
         }
         
-        success = True
+        service_names = list(dict.fromkeys(
+            service_map[dep] for dep in self.installed_dependencies if dep in service_map
+        ))
+        if not service_names:
+            return True
         
-        for dep in self.installed_dependencies:
-            if dep in service_map:
-                service_name = service_map[dep]
-                restart_script = f'''
+        restart_script = f'''
 set -e
-echo "Restarting {service_name} on {self.os_type}..."
-
-# Check if service exists first
-if {self.svc_commands['status']} {service_name} >/dev/null 2>&1 || systemctl list-unit-files | grep -q "^{service_name}.service"; then
-    {self.svc_commands['restart']} {service_name}
-    {self.svc_commands['enable']} {service_name}
-    
-    # Wait a moment and verify it's running
-    sleep 2
-    if {self.svc_commands['is_active']} {service_name}; then
-        echo "✅ {service_name} restarted and running"
+echo "Restarting {' '.join(service_names)} on {self.os_type}..."
+
+# List unit files once; services that don't exist are skipped
+UNITS=$(systemctl list-unit-files --type=service --no-legend 2>/dev/null | awk '{{print $1}}')
+SERVICES=""
+for service in {' '.join(service_names)}; do
+    if grep -qx "$service.service" <<< "$UNITS" || {self.svc_commands['status']} $service >/dev/null 2>&1; then
+        SERVICES="$SERVICES $service"
     else
-        echo "⚠️  {service_name} restarted but not active"
-        {self.svc_commands['status']} {service_name} --no-pager || true
+        echo "ℹ️  $service service not found, skipping"
     fi
-else
-    echo "ℹ️  {service_name} service not found, skipping"
-fi
+done
+[ -n "$SERVICES" ] || exit 0
+
+# One systemctl call restarts all of them in parallel
+RESTART_STATUS=0
+{self.svc_commands['restart']} $SERVICES || RESTART_STATUS=$?
+{self.svc_commands['enable']} $SERVICES
+
+# Wait a moment and verify they're running
+sleep 2
+for service in $SERVICES; do
+    if {self.svc_commands['is_active']} $service; then
+        echo "✅ $service restarted and running"
+    elif [ $RESTART_STATUS -ne 0 ]; then
+        echo "RESTART_FAILED: $service" >&2
+        {self.svc_commands['status']} $service --no-pager >&2 || true
+    else
+        echo "⚠️  $service restarted but not active"
+        {self.svc_commands['status']} $service --no-pager || true
+    fi
+done
+exit $RESTART_STATUS
 '''
-                
-                svc_success, output = self.client.run_command(restart_script, timeout=60)
-                if not svc_success:
-                    print(f"⚠️  Failed to restart {service_name}")
-                    print(f"Output: {output}")
-                    success = False
+        
+        success, output = self.client.run_command(restart_script, timeout=60)
+        if not success:
+            failed = [line.split(':', 1)[1].strip() for line in output.splitlines()
+                      if line.startswith('RESTART_FAILED:')]
+            for service_name in failed or service_names:
+                logger.warning(f"⚠️  Failed to restart {service_name}")
+            logger.info(f"Output: {output}")
         
         return success
 
@@ -1473,14 +1807,14 @@ fi
             bool: True if successful, False otherwise
         """
         try:
-            print(f"🔗 Configuring external {db_type.upper()} RDS database...")
+            logger.info(f"🔗 Configuring external {db_type.upper()} RDS database...")
             
             # Get RDS configuration
             rds_config = config.get('rds', {})
             db_name = rds_config.get('database_name')
             
             if not db_name:
-                print(f"❌ RDS database name not specified in configuration")
+                logger.error(f"❌ RDS database name not specified in configuration")
                 return False
             
             # Initialize RDS manager
@@ -1492,33 +1826,33 @@ fi
             )
             
             # Get RDS connection details
-            print(f"📡 Retrieving RDS connection details for {db_name}...")
+            logger.info(f"📡 Retrieving RDS connection details for {db_name}...")
             connection_details = rds_manager.get_rds_connection_details(db_name)
             
             if not connection_details:
-                print(f"❌ Failed to retrieve RDS connection details for {db_name}")
+                logger.error(f"❌ Failed to retrieve RDS connection details for {db_name}")
                 return False
             
             # Install database client
-            print(f"📦 Installing {db_type} client...")
+            logger.info(f"📦 Installing {db_type} client...")
             client_success = self._install_database_client(db_type)
             
             if not client_success:
-                print(f"❌ Failed to install {db_type} client")
+                logger.error(f"❌ Failed to install {db_type} client")
                 return False
             
             # Test database connectivity
-            print(f"🔍 Testing database connectivity...")
+            logger.info(f"🔍 Testing database connectivity...")
             connectivity_success = rds_manager.test_rds_connectivity(
                 connection_details, 
                 rds_config.get('master_database', 'app_db')
             )
             
             if not connectivity_success:
-                print(f"⚠️  Database connectivity test failed, but continuing...")
+                logger.warning(f"⚠️  Database connectivity test failed, but continuing...")
             
             # Configure environment variables for application
-            print(f"⚙️  Configuring environment variables...")
+            logger.info(f"⚙️  Configuring environment variables...")
             env_vars = rds_manager.create_database_env_vars(
                 connection_details, 
                 rds_config.get('master_database', 'app_db')
@@ -1526,51 +1860,51 @@ fi
             env_success = self._create_environment_file(env_vars, config)
             
             if not env_success:
-                print(f"⚠️  Failed to configure environment variables")
+                logger.warning(f"⚠️  Failed to configure environment variables")
                 return False
             
-            print(f"✅ External {db_type.upper()} RDS database configured successfully")
-            print(f"   Host: {connection_details['endpoint']}")
-            print(f"   Port: {connection_details['port']}")
-            print(f"   Database: {connection_details['database_name']}")
-            print(f"   Username: {connection_details['master_username']}")
+            logger.info(f"✅ External {db_type.upper()} RDS database configured successfully")
+            logger.info(f"   Host: {connection_details['endpoint']}")
+            logger.info(f"   Port: {connection_details['port']}")
+            logger.info(f"   Database: {connection_details['database_name']}")
+            logger.info(f"   Username: {connection_details['master_username']}")
             
             return True
             
         except Exception as e:
-            print(f"❌ Error configuring external {db_type} database: {str(e)}")
+            logger.error(f"❌ Error configuring external {db_type} database: {str(e)}")
             return False
     
     def _install_database_client(self, db_type: str) -> bool:
         """Install database client tools (OS-agnostic)"""
         if db_type == 'mysql':
             # Get OS-specific MySQL client packages
-            mysql_client_packages = self.os_packages.get('mysql_client', {}).get('packages', ['mysql-client'])
+            mysql_client_packages = self.os_packages['mysql_client']['packages']
             
             script = f'''
 set -e
 echo "Installing MySQL client on {self.os_type}..."
 
 # Install MySQL client
-{self.pkg_commands['install']} {' '.join(mysql_client_packages)}
+{self.pkg_commands['install']} {shlex.join(mysql_client_packages)}
 
 echo "✅ MySQL client installation completed on {self.os_type}"
 '''
         elif db_type == 'postgresql':
             # Get OS-specific PostgreSQL client packages
-            pg_client_packages = self.os_packages.get('postgresql_client', {}).get('packages', ['postgresql-client'])
+            pg_client_packages = self.os_packages['postgresql_client']['packages']
             
             script = f'''
 set -e
 echo "Installing PostgreSQL client on {self.os_type}..."
 
 # Install PostgreSQL client
-{self.pkg_commands['install']} {' '.join(pg_client_packages)}
+{self.pkg_commands['install']} {shlex.join(pg_client_packages)}
 
 echo "✅ PostgreSQL client installation completed on {self.os_type}"
 '''
         else:
-            print(f"❌ Unsupported database type: {db_type}")
+            logger.error(f"❌ Unsupported database type: {db_type}")
             return False
         
         success, output = self.client.run_command(script, timeout=420)
@@ -1584,95 +1918,38 @@ echo "✅ PostgreSQL client installation completed on {self.os_type}"
             env_vars.update(custom_env)
             
             # Create environment file
-            env_content = '\n'.join([f'{key}={value}' for key, value in env_vars.items()])
+            env_content = '\n'.join(f'{key}={value}' for key, value in env_vars.items())
             
             # Get OS-specific user and group information
             web_user = self.user_info.get('web_user', 'www-data')
             web_group = self.user_info.get('web_group', 'www-data')
             
-            script = f'''
-set -e
-echo "Configuring database environment variables..."
-
-# Create environment file in /opt/app
-sudo mkdir -p /opt/app
-cat << 'EOF' | sudo tee /opt/app/database.env > /dev/null
-{env_content}
-EOF
-
-# Set proper permissions for /opt/app/database.env (readable by web group)
-sudo chmod 640 /opt/app/database.env
-sudo chown root:{web_group} /opt/app/database.env
-
-# Also create a copy in web directory for direct access
-sudo cp /opt/app/database.env /var/www/html/.env
-sudo chmod 640 /var/www/html/.env
-sudo chown {web_user}:{web_group} /var/www/html/.env
-
-echo "✅ Database environment configuration completed"
-echo "Environment file created at: /opt/app/database.env"
-echo "Environment file copied to: /var/www/html/.env"
-'''
-            
-            success, output = self.client.run_command(script, timeout=60)
-            
-            if success:
-                print("📝 Database environment variables configured:")
-                for key, value in env_vars.items():
-                    if 'PASSWORD' in key:
-                        print(f"   {key}=***")
-                    else:
-                        print(f"   {key}={value}")
-            
-            return success
-            
-        except Exception as e:
-            print(f"❌ Error creating environment file: {str(e)}")
-            return False
-
-    def _configure_database_environment(self, db_type: str, connection_details: Dict[str, Any], config: Dict[str, Any]) -> bool:
-        """Configure environment variables for database connection"""
-        try:
-            # Create environment file for database configuration
-            env_vars = {
-                f'DB_TYPE': db_type.upper(),
-                f'DB_HOST': connection_details['host'],
-                f'DB_PORT': str(connection_details['port']),
-                f'DB_NAME': connection_details['database'],
-                f'DB_USERNAME': connection_details['username'],
-                f'DB_PASSWORD': connection_details['password'],
-                f'DB_EXTERNAL': 'true'
-            }
-            
-            # Add any custom environment variables from config
-            custom_env = config.get('environment', {})
-            env_vars.update(custom_env)
-            
-            # Create environment file
-            env_content = '\n'.join([f'{key}={value}' for key, value in env_vars.items()])
-            
-            # Get OS-specific user and group information
-            web_user = self.user_info.get('web_user', 'www-data')
-            web_group = self.user_info.get('web_group', 'www-data')
+            # Fingerprint of the written file; redeploys with the same settings skip the rewrite
+            env_hash = hashlib.blake2b(f"{web_user}:{web_group}\n{env_content}".encode(),
+                                       digest_size=16).hexdigest()
             
             script = f'''
 set -e
 echo "Configuring database environment variables..."
 
-# Create environment file in /opt/app
-sudo mkdir -p /opt/app
-cat << 'EOF' | sudo tee /opt/app/database.env > /dev/null
+# Nothing to do if the last deploy wrote the same file and the web copy still matches it
+if [ "$(sudo cat /opt/app/database.env.hash 2>/dev/null)" = "{env_hash}" ] && \\
+   sudo cmp -s /opt/app/database.env /var/www/html/.env; then
+    echo "✅ Database environment unchanged, skipping"
+    exit 0
+fi
+
+# Create environment file in /opt/app, readable by the web group
+# (install creates the directory and sets owner and mode as it writes)
+sudo install -D -o root -g {web_group} -m 640 /dev/stdin /opt/app/database.env << 'EOF'
 {env_content}
 EOF
 
-# Set proper permissions for /opt/app/database.env (readable by web group)
-sudo chmod 640 /opt/app/database.env
-sudo chown root:{web_group} /opt/app/database.env
-
 # Also create a copy in web directory for direct access
-sudo cp /opt/app/database.env /var/www/html/.env
-sudo chmod 640 /var/www/html/.env
-sudo chown {web_user}:{web_group} /var/www/html/.env
+sudo install -o {web_user} -g {web_group} -m 640 /opt/app/database.env /var/www/html/.env
+printf '%s' "{env_hash}" | sudo tee /opt/app/database.env.hash > /dev/null
+# The web copy was replaced, so the app environment fingerprint no longer applies
+sudo rm -f /var/www/html/.env.hash
 
 echo "✅ Database environment configuration completed"
 echo "Environment file created at: /opt/app/database.env"
@@ -1682,17 +1959,17 @@ echo "Environment file copied to: /var/www/html/.env"
             success, output = self.client.run_command(script, timeout=60)
             
             if success:
-                print("📝 Database environment variables configured:")
+                logger.info("📝 Database environment variables configured:")
                 for key, value in env_vars.items():
                     if 'PASSWORD' in key:
-                        print(f"   {key}=***")
+                        logger.info(f"   {key}=***")
                     else:
-                        print(f"   {key}={value}")
+                        logger.info(f"   {key}={value}")
             
             return success
             
         except Exception as e:
-            print(f"❌ Error configuring database environment: {str(e)}")
+            logger.error(f"❌ Error creating environment file: {str(e)}")
             return False
 
     def get_installation_summary(self) -> Dict[str, Any]:
@@ -434,23 +434,8 @@ echo "✅ Application files deployed successfully"
         
         print(f"📋 Running {len(configurators)} configurator(s)...")
         
-        # Run each configurator
-        success = True
-        for configurator in configurators:
-            configurator_name = configurator.__class__.__name__
-            print(f"\n🔧 Running {configurator_name}...")
-            
-            try:
-                if not configurator.configure():
-                    print(f"⚠️  {configurator_name} reported issues")
-                    success = False
-                else:
-                    print(f"✅ {configurator_name} completed successfully")
-            except Exception as e:
-                print(f"❌ {configurator_name} failed with error: {str(e)}")
-                success = False
-        
-        return success
+        # Batch configurator scripts into one SSH session where possible
+        return ConfiguratorFactory.run_all(self.client, configurators)
 
     def _setup_app_specific_config(self) -> bool:
         """Set up application-specific configurations (OS-agnostic)"""
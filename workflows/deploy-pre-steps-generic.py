@@ -4,12 +4,76 @@ Generic pre-deployment steps for AWS Lightsail
 This script handles dependency installation and configuration based on config
 """
 
-import os
 import sys
+import time
 import argparse
-from lightsail_common import LightsailBase
+import hashlib
+import traceback
+import shlex
+from botocore.exceptions import BotoCoreError, ClientError
+from lightsail_common import LightsailBase, IS_CI
 from config_loader import DeploymentConfig
 from dependency_manager import DependencyManager
+from os_detector import OSDetector
+
+# Pre-deployment health report; only the package manager varies between
+# deploys, so callers prepend a PKG_MGR=<apt|yum|dnf> assignment
+HEALTH_CHECK_SCRIPT = '''
+set +e  # Don't exit on error, we want to check everything
+
+echo "Checking disk space..."
+df -h / | tail -1 | awk '{print "Disk usage: " $5 " used of " $2}'
+
+echo ""
+echo "Checking memory..."
+free -h | grep Mem | awk '{print "Memory: " $3 " used of " $2}'
+
+echo ""
+echo "Checking package manager state..."
+if [ "$PKG_MGR" = "apt" ]; then
+    if sudo dpkg --audit 2>&1 | grep -q "broken"; then
+        echo "❌ dpkg is in broken state"
+        echo "Attempting to fix..."
+        sudo dpkg --configure -a
+        sudo apt-get install -f -y
+        echo "✅ dpkg fixed"
+    else
+        echo "✅ dpkg is healthy"
+    fi
+    
+    echo ""
+    echo "Checking apt locks..."
+    if sudo lsof /var/lib/dpkg/lock-frontend 2>/dev/null; then
+        echo "⚠️  apt is locked by another process"
+        echo "Waiting for lock to be released..."
+        sleep 10
+    else
+        echo "✅ No apt locks detected"
+    fi
+elif [ "$PKG_MGR" = "yum" ] || [ "$PKG_MGR" = "dnf" ]; then
+    echo "Checking yum/dnf locks..."
+    if sudo lsof /var/run/yum.pid 2>/dev/null || sudo lsof /var/lib/dnf/dnf.librepo.lock 2>/dev/null; then
+        echo "⚠️  Package manager is locked by another process"
+        echo "Waiting for lock to be released..."
+        sleep 10
+    else
+        echo "✅ No package manager locks detected"
+    fi
+else
+    echo "ℹ️  Unknown package manager, skipping package manager checks"
+fi
+
+echo ""
+echo "Checking connectivity..."
+if ping -c 1 8.8.8.8 >/dev/null 2>&1; then
+    echo "✅ Internet connectivity OK"
+else
+    echo "⚠️  Internet connectivity issue"
+fi
+
+echo ""
+echo "✅ Health check completed"
+'''
 
 class GenericPreDeployer:
     def __init__(self, instance_name=None, region=None, config=None, os_type=None, package_manager=None):
@@ -26,23 +90,29 @@ class GenericPreDeployer:
         self.config = config
         self.client = LightsailBase(instance_name, region)
         
+        # One get_instances call up front; the instance checks in each phase
+        # then read the cached description
+        try:
+            self._instance_snapshot = self.client.warm_instance_cache()
+        except (BotoCoreError, ClientError) as e:
+            print(f"⚠️  Could not list instances, falling back to per-check lookups: {e}")
+            self._instance_snapshot = []
+        
+        # OS-specific users, looked up once for the directory and environment scripts
+        self.user_info = OSDetector.get_user_info(os_type) if os_type else None
+        
         # Set OS information on client for configurators to use
         if os_type:
             self.client.os_type = os_type
         if package_manager:
             # Use OSDetector to get proper user info structure
-            from os_detector import OSDetector
-            os_info = OSDetector.get_user_info(os_type) if os_type else {}
+            os_info = dict(self.user_info) if self.user_info else {}
             os_info['package_manager'] = package_manager
             os_info['service_manager'] = 'systemd'  # Most modern systems use systemd
             self.client.os_info = os_info
         
-        # Initialize dependency manager with OS information
-        from os_detector import OSDetector
+        # Initialize dependency manager with the same OS information
         if os_type and package_manager:
-            os_info = OSDetector.get_user_info(os_type)
-            os_info['package_manager'] = package_manager
-            os_info['service_manager'] = 'systemd'  # Most modern systems use systemd
             self.dependency_manager = DependencyManager(self.client, config, os_type, os_info)
         else:
             self.dependency_manager = DependencyManager(self.client, config)
@@ -56,7 +126,7 @@ class GenericPreDeployer:
         # CRITICAL: Verify instance exists and is running before starting
         print("🔍 CRITICAL CHECK: Verifying instance exists and is running...")
         try:
-            response = self.client.lightsail.get_instance(instanceName=self.client.instance_name)
+            response = self.client.get_instance_cached()
             instance = response['instance']
             state = instance['state']['name']
             public_ip = instance.get('publicIpAddress', 'No IP')
@@ -76,23 +146,13 @@ class GenericPreDeployer:
                     return False
                 elif state in ['pending', 'rebooting']:
                     print(f"   Instance is still starting up, waiting...")
-                    import time
-                    for i in range(6):  # Wait up to 3 minutes
-                        time.sleep(30)
-                        response = self.client.lightsail.get_instance(instanceName=self.client.instance_name)
-                        instance = response['instance']
-                        state = instance['state']['name']
-                        print(f"   Wait {i+1}/6: Instance state is now: {state}")
-                        if state == 'running':
-                            print(f"✅ Instance is now running!")
-                            break
-                    else:
+                    if not self.client.wait_for_instance_state('running', timeout=180):
                         print(f"❌ Instance did not reach running state within 3 minutes")
                         return False
             else:
                 print(f"✅ Instance is running and ready for deployment")
                 
-        except Exception as e:
+        except (BotoCoreError, ClientError, KeyError) as e:
             print(f"❌ CRITICAL ERROR: Cannot access instance '{self.client.instance_name}': {e}")
             print(f"   This means the instance was deleted, terminated, or never existed.")
             return False
@@ -147,21 +207,25 @@ class GenericPreDeployer:
             if not config_success:
                 print("⚠️  Some service configurations failed")
         
-        # Prepare application directory structure
+        # Prepare application directory structure and environment variables in one session
         print("\n" + "="*60)
-        print("📁 PREPARING DIRECTORY STRUCTURE")
+        print("📁 PREPARING DIRECTORIES AND ENVIRONMENT VARIABLES")
         print("="*60)
-        success = self._prepare_app_directories()
-        if not success:
+        directories_script = self._app_directories_script()
+        if directories_script is None:
             print("❌ Failed to prepare application directories")
             return False
         
-        # Set up environment variables
-        print("\n" + "="*60)
-        print("🌍 SETTING UP ENVIRONMENT VARIABLES")
-        print("="*60)
-        success = self._setup_environment_variables()
-        if not success:
+        steps = [('directories', directories_script)]
+        environment_script = self._environment_variables_script()
+        if environment_script is not None:
+            steps.append(('environment', environment_script))
+        
+        failed_steps = self._run_steps(steps, timeout=180)
+        if 'directories' in failed_steps:
+            print("❌ Failed to prepare application directories")
+            return False
+        if 'environment' in failed_steps:
             print("⚠️  Failed to set up some environment variables")
         
         print("\n" + "="*60)
@@ -182,12 +246,53 @@ class GenericPreDeployer:
         
         return True
 
-    def _prepare_app_directories(self) -> bool:
-        """Prepare application directory structure"""
+    def _run_steps(self, steps, timeout):
+        """
+        Run (label, script) steps in a single SSH session
+        
+        Each step runs in its own subshell, so its `set -e` only aborts that
+        step; failed steps are reported on stderr as STEP_FAILED: <label>.
+        
+        Args:
+            steps: List of (label, script) tuples, run in order
+            timeout: Timeout for the whole session in seconds
+            
+        Returns:
+            set: Labels of the steps that failed
+        """
+        fragments = ['FAILED=""']
+        for label, script in steps:
+            fragments.append(f'''
+(
+{script}
+)
+if [ $? -ne 0 ]; then
+    echo "STEP_FAILED: {label}" >&2
+    FAILED="$FAILED {label}"
+fi
+''')
+        fragments.append('[ -z "$FAILED" ] || exit 1')
+        
+        success, output = self.client.run_command('\n'.join(fragments), timeout=timeout)
+        if success:
+            return set()
+        
+        failed = {line.split(':', 1)[1].strip() for line in output.splitlines()
+                  if line.startswith('STEP_FAILED:')}
+        # Without markers the session itself failed (timeout, SSH error)
+        return failed or {label for label, _ in steps}
+
+    def _app_directories_script(self):
+        """
+        Build the script that prepares the application directory structure
+        
+        Returns:
+            str: The script, or None if the instance is not usable
+        """
         # First, verify the instance still exists
         print("🔍 Verifying instance exists before preparing directories...")
         try:
-            response = self.client.lightsail.get_instance(instanceName=self.client.instance_name)
+            response = self.client.get_instance_cached()
             instance = response['instance']
             state = instance['state']['name']
             print(f"✅ Instance '{self.client.instance_name}' exists with state: {state}")
@@ -196,23 +301,15 @@ class GenericPreDeployer:
                 print(f"⚠️  Instance is not in running state: {state}")
                 if state in ['stopping', 'stopped', 'terminated']:
                     print(f"❌ Instance has been terminated or stopped!")
-                    return False
+                    return None
                 elif state in ['pending', 'rebooting']:
                     print(f"⏳ Instance is {state}, waiting for it to be ready...")
-                    # Wait a bit for the instance to be ready
-                    import time
-                    time.sleep(30)
-                    # Check again
-                    response = self.client.lightsail.get_instance(instanceName=self.client.instance_name)
-                    instance = response['instance']
-                    state = instance['state']['name']
-                    print(f"   Instance state after wait: {state}")
-                    if state != 'running':
-                        print(f"❌ Instance still not running after wait: {state}")
-                        return False
-        except Exception as e:
+                    if not self.client.wait_for_instance_state('running', timeout=30):
+                        print(f"❌ Instance still not running after wait")
+                        return None
+        except (BotoCoreError, ClientError, KeyError) as e:
             print(f"❌ Error checking instance existence: {e}")
-            return False
+            return None
         
         app_type = self.config.get('application.type', 'web')
         
@@ -224,93 +321,60 @@ class GenericPreDeployer:
             web_root = self.config.get('dependencies.apache.config.document_root', '/var/www/html')
         
         # Get OS-specific user information
-        from os_detector import OSDetector
-        if hasattr(self.client, 'os_type') and self.client.os_type:
-            os_info = OSDetector.get_user_info(self.client.os_type)
-            system_user = os_info['default_user']
-            system_group = os_info['default_user']  # Use same as user for group
+        if self.user_info:
+            system_user = self.user_info['default_user']
+            system_group = self.user_info['default_user']  # Use same as user for group
         else:
             # Fallback to Ubuntu defaults
             system_user = 'ubuntu'
             system_group = 'ubuntu'
         
-        # CRITICAL FIX: Use system user initially, web server users will be set later after installation
-        script = f'''
-set -e
-echo "Preparing application directories..."
-
-# Create main application directory
-sudo mkdir -p {web_root}
-sudo mkdir -p {web_root}/tmp
-sudo mkdir -p {web_root}/logs
-sudo mkdir -p {web_root}/config
-
-# Create backup directory
-sudo mkdir -p /var/backups/app
-
-# IMPORTANT: Use system user initially since web server users don't exist yet
-# Web server ownership will be set later in post-deployment steps after services are installed
-echo "Setting initial ownership to system user ({system_user}:{system_group})"
-sudo chown -R {system_user}:{system_group} {web_root}
-sudo chmod -R 755 {web_root}
-sudo chmod -R 777 {web_root}/tmp
-sudo chmod -R 755 {web_root}/logs
-
-# Create application-specific directories based on enabled dependencies
-'''
+        # Directories to create, and the roots handed to the system user
+        directories = [web_root, f'{web_root}/tmp', f'{web_root}/logs', f'{web_root}/config', '/var/backups/app']
+        owned = [web_root]
         
         # Add Python-specific directories if Python is enabled
         if self.config.get('dependencies.python.enabled', False):
             python_config = self.config.get('dependencies.python.config', {})
             venv_path = python_config.get('virtualenv_path', '/opt/python-venv/app')
-            script += f'''
-# Python application directories
-sudo mkdir -p /opt/app
-sudo mkdir -p /var/log/app
-sudo mkdir -p {venv_path}
-sudo chown -R {system_user}:{system_group} /opt/app
-sudo chown -R {system_user}:{system_group} /var/log/app
-sudo chown -R {system_user}:{system_group} {venv_path}
-'''
+            owned += ['/opt/app', '/var/log/app', venv_path]
         
         # Add Node.js-specific directories if Node.js is enabled
         if self.config.get('dependencies.nodejs.enabled', False):
-            script += f'''
-# Node.js application directories
-sudo mkdir -p /opt/nodejs-app
-sudo mkdir -p /var/log/nodejs
-sudo chown -R {system_user}:{system_group} /opt/nodejs-app
-sudo chown -R {system_user}:{system_group} /var/log/nodejs
-'''
+            owned += ['/opt/nodejs-app', '/var/log/nodejs']
         
-        # Add database-specific directories only if they will be installed locally
+        # Database backup directories only if the databases will be installed locally
+        # (not external RDS); their ownership is set after the database installation
         if self.config.get('dependencies.mysql.enabled', False):
-            # Only create mysql directories if using local MySQL (not external RDS)
-            mysql_config = self.config.get('dependencies', {}).get('mysql', {})
-            if not mysql_config.get('external', False):
-                script += f'''
-# MySQL backup directory (ownership will be set after MySQL installation)
-sudo mkdir -p /var/backups/mysql
-sudo chown -R {system_user}:{system_group} /var/backups/mysql
-'''
+            if not self.config.get('dependencies.mysql.external', False):
+                owned.append('/var/backups/mysql')
         
         if self.config.get('dependencies.postgresql.enabled', False):
-            # Only create postgres directories if using local PostgreSQL (not external RDS)
-            pg_config = self.config.get('dependencies', {}).get('postgresql', {})
-            if not pg_config.get('external', False):
-                script += f'''
-# PostgreSQL backup directory (ownership will be set after PostgreSQL installation)
-sudo mkdir -p /var/backups/postgresql
-sudo chown -R {system_user}:{system_group} /var/backups/postgresql
-'''
+            if not self.config.get('dependencies.postgresql.external', False):
+                owned.append('/var/backups/postgresql')
+        
+        directories += owned[1:]
         
-        script += '''
+        # CRITICAL FIX: Use system user initially, web server users will be set later after installation
+        script = f'''
+set -e
+echo "Preparing application directories..."
+
+# Create application, backup and dependency-specific directories
+sudo mkdir -p {shlex.join(directories)}
+
+# IMPORTANT: Use system user initially since web server users don't exist yet
+# Web server ownership will be set later in post-deployment steps after services are installed
+echo "Setting initial ownership to system user ({system_user}:{system_group})"
+sudo chown -R {system_user}:{system_group} {shlex.join(owned)}
+sudo chmod -R 755 {shlex.quote(web_root)}
+sudo chmod -R 777 {shlex.quote(web_root + '/tmp')}
+
 echo "✅ Application directories prepared with system user ownership"
 echo "   Web server ownership will be set after services are installed"
 '''
         
-        success, output = self.client.run_command(script, timeout=120)
-        return success
+        return script
 
     def _system_health_check(self) -> bool:
         """Perform system health checks before deployment with enhanced resilience"""
@@ -319,7 +383,7 @@ echo "   Web server ownership will be set after services are installed"
         # First, verify the instance still exists and is running
         print("🔍 Verifying instance state before health check...")
         try:
-            response = self.client.lightsail.get_instance(instanceName=self.client.instance_name)
+            response = self.client.get_instance_cached()
             instance = response['instance']
             state = instance['state']['name']
             print(f"✅ Instance '{self.client.instance_name}' state: {state}")
@@ -331,17 +395,16 @@ echo "   Web server ownership will be set after services are installed"
                     return False
                 else:
                     print(f"⏳ Instance is {state}, waiting for it to be ready...")
-                    import time
-                    time.sleep(30)
-        except Exception as e:
+                    self.client.wait_for_instance_state('running', timeout=30)
+        except (BotoCoreError, ClientError, KeyError) as e:
             print(f"❌ Error checking instance during health check: {e}")
             return False
         
         # Test SSH connectivity with reduced retries for faster deployment
         print("🔗 Testing SSH connectivity...")
         # Reduce retries in pre-steps to speed up deployment
-        max_retries = 3 if "GITHUB_ACTIONS" in os.environ else 5
-        timeout = 30 if "GITHUB_ACTIONS" in os.environ else 60
+        max_retries = 3 if IS_CI else 5
+        timeout = 30 if IS_CI else 60
         ssh_ok = self.client.test_ssh_connectivity(timeout=timeout, max_retries=max_retries)
         if not ssh_ok:
             print("⚠️  SSH connectivity issues detected, but continuing...")
@@ -353,70 +416,21 @@ echo "   Web server ownership will be set after services are installed"
         else:
             package_manager = 'unknown'
         
-        health_script = f'''
-#!/bin/bash
-set +e  # Don't exit on error, we want to check everything
-
-echo "Checking disk space..."
-df -h / | tail -1 | awk '{{print "Disk usage: " $5 " used of " $2}}'
-
-echo ""
-echo "Checking memory..."
-free -h | grep Mem | awk '{{print "Memory: " $3 " used of " $2}}'
-
-echo ""
-echo "Checking package manager state..."
-if [ "{package_manager}" = "apt" ]; then
-    if sudo dpkg --audit 2>&1 | grep -q "broken"; then
-        echo "❌ dpkg is in broken state"
-        echo "Attempting to fix..."
-        sudo dpkg --configure -a
-        sudo apt-get install -f -y
-        echo "✅ dpkg fixed"
-    else
-        echo "✅ dpkg is healthy"
-    fi
-    
-    echo ""
-    echo "Checking apt locks..."
-    if sudo lsof /var/lib/dpkg/lock-frontend 2>/dev/null; then
-        echo "⚠️  apt is locked by another process"
-        echo "Waiting for lock to be released..."
-        sleep 10
-    else
-        echo "✅ No apt locks detected"
-    fi
-elif [ "{package_manager}" = "yum" ] || [ "{package_manager}" = "dnf" ]; then
-    echo "Checking yum/dnf locks..."
-    if sudo lsof /var/run/yum.pid 2>/dev/null || sudo lsof /var/lib/dnf/dnf.librepo.lock 2>/dev/null; then
-        echo "⚠️  Package manager is locked by another process"
-        echo "Waiting for lock to be released..."
-        sleep 10
-    else
-        echo "✅ No package manager locks detected"
-    fi
-else
-    echo "ℹ️  Unknown package manager, skipping package manager checks"
-fi
-
-echo ""
-echo "Checking connectivity..."
-if ping -c 1 8.8.8.8 >/dev/null 2>&1; then
-    echo "✅ Internet connectivity OK"
-else
-    echo "⚠️  Internet connectivity issue"
-fi
-
-echo ""
-echo "✅ Health check completed"
-'''
+        health_script = f"PKG_MGR={shlex.quote(package_manager)}\n{HEALTH_CHECK_SCRIPT}"
         
         # Use enhanced retry for health check
         max_retries = 3
-        if "GITHUB_ACTIONS" in os.environ:
+        if IS_CI:
             max_retries = 5  # More retries in CI environment
         
-        success, output = self.client.run_command(health_script, timeout=180, max_retries=max_retries)
+        # Stream the report as it runs; only the tail is kept for the result
+        for attempt in range(max_retries):
+            success, output = self.client.run_command_with_live_output(health_script, timeout=180)
+            if success:
+                break
+            if attempt < max_retries - 1:
+                print(f"⚠️  Health check attempt {attempt + 1}/{max_retries} failed, retrying in 5s...")
+                time.sleep(5)
         
         # Don't fail deployment for health check issues - log and continue
         if not success:
@@ -426,36 +440,46 @@ echo "✅ Health check completed"
         
         return success
 
-    def _setup_environment_variables(self) -> bool:
-        """Set up application environment variables"""
+    def _environment_variables_script(self):
+        """
+        Build the script that sets up application environment variables
+        
+        Returns:
+            str: The script, or None if no environment variables are configured
+        """
         env_vars = self.config.get_environment_variables()
         
         if not env_vars:
             print("ℹ️  No environment variables configured")
-            return True
+            return None
         
         # Create environment file content
-        env_content = []
-        for key, value in env_vars.items():
-            env_content.append(f'{key}="{value}"')
-        
-        env_file_content = '\n'.join(env_content)
+        env_file_content = '\n'.join(f'{key}="{value}"' for key, value in env_vars.items())
         
         # Get OS-specific user information
-        from os_detector import OSDetector
-        if hasattr(self.client, 'os_type') and self.client.os_type:
-            os_info = OSDetector.get_user_info(self.client.os_type)
-            web_user = os_info['web_user']
-            web_group = os_info['web_group']
+        if self.user_info:
+            web_user = self.user_info['web_user']
+            web_group = self.user_info['web_group']
         else:
             # Fallback to Ubuntu defaults
             web_user = 'www-data'
             web_group = 'www-data'
         
+        # Fingerprint of what gets written, stored next to .env so an
+        # unchanged redeploy can skip the rewrite
+        env_hash = hashlib.blake2b(f"{web_user}:{web_group}\n{env_file_content}".encode(),
+                                   digest_size=16).hexdigest()
+        
         script = f'''
 set -e
 echo "Setting up environment variables..."
 
+# Nothing to do if the last deploy wrote the same file
+if [ -f /var/www/html/.env ] && [ "$(sudo cat /var/www/html/.env.hash 2>/dev/null)" = "{env_hash}" ]; then
+    echo "✅ Environment variables unchanged, skipping"
+    exit 0
+fi
+
 # Create environment file
 cat > /tmp/app.env << 'EOF'
 {env_file_content}
@@ -468,12 +492,12 @@ sudo chmod 600 /var/www/html/.env
 
 # Also create system-wide environment file
 sudo cp /var/www/html/.env /etc/environment.d/app.conf || true
+printf '%s' "{env_hash}" | sudo tee /var/www/html/.env.hash > /dev/null
 
 echo "✅ Environment variables configured"
 '''
         
-        success, output = self.client.run_command(script, timeout=60)
-        return success
+        return script
 
 def main():
     parser = argparse.ArgumentParser(description='Generic pre-deployment steps for AWS Lightsail')
@@ -522,7 +546,6 @@ def main():
             
     except Exception as e:
         print(f"❌ Error in generic pre-deployment steps: {str(e)}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
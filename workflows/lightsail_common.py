@@ -4,21 +4,53 @@ Common utilities for AWS Lightsail deployment workflows
 This module provides shared functionality for SSH connections, file operations, and AWS client management
 """
 
+import base64
 import boto3
+import collections
 import subprocess
 import tempfile
+import threading
 import os
 import time
 import sys
 import socket
+from datetime import datetime, timedelta, timezone
 from botocore.exceptions import ClientError, NoCredentialsError
 
+# GitHub Actions runners get more patient retries and longer-lived caches
+IS_CI = "GITHUB_ACTIONS" in os.environ
+
+# Reuse one SSH connection per host across ssh/scp invocations: the first call
+# becomes the master, later ones skip the TCP + key exchange + auth handshake.
+# Connection-level options only take effect on whichever call opens the master,
+# so they live here instead of in the per-command option lists.
+SSH_MULTIPLEX_OPTIONS = [
+    '-o', 'ControlMaster=auto',
+    '-o', f"ControlPath={os.path.join(tempfile.gettempdir(), 'lightsail-cm-%C')}",
+    '-o', 'ControlPersist=600',
+    '-o', f"ConnectTimeout={60 if IS_CI else 30}",
+    '-o', f"ServerAliveInterval={30 if IS_CI else 10}",
+    '-o', f"ServerAliveCountMax={6 if IS_CI else 3}",
+    '-o', 'TCPKeepAlive=yes',
+]
+
+# Lines of streamed output kept in memory (and returned) by run_command_with_live_output
+LIVE_OUTPUT_TAIL_LINES = 200
+
+# Seconds a cached get_instance response is reused; in CI nothing else touches
+# the instance while a deployment runs, so the snapshot stays valid longer
+INSTANCE_CACHE_TTL = 60.0 if IS_CI else 30.0
+
 class LightsailBase:
     """Base class for Lightsail operations with common SSH and AWS functionality"""
     
     def __init__(self, instance_name, region='us-east-1'):
         self.instance_name = instance_name
         self.region = region
+        # (time.monotonic() of the call, get_instance response), see get_instance_cached
+        self._instance_cache = None
+        # Last accessDetails from get_instance_access_details, see get_access_details
+        self._access_details = None
         try:
             self.lightsail = boto3.client('lightsail', region_name=region)
         except NoCredentialsError:
@@ -44,7 +76,7 @@ class LightsailBase:
                 if attempt > 0:
                     print(f"🔄 Retry attempt {attempt + 1}/{max_retries}")
                     # Optimized backoff for GitHub Actions - shorter waits for faster deployment
-                    if "GITHUB_ACTIONS" in os.environ:
+                    if IS_CI:
                         wait_time = min(5 + (attempt * 5), 20)  # Faster retries in CI
                     else:
                         wait_time = min(15 + (attempt * 10), 60)  # Original timing for local
@@ -55,30 +87,12 @@ class LightsailBase:
                     if not self.test_network_connectivity():
                         print("   ⚠️ Network connectivity still failing, continuing retry...")
                 
-                # Get SSH access details first
-                ssh_response = self.lightsail.get_instance_access_details(instanceName=self.instance_name)
-                ssh_details = ssh_response['accessDetails']
+                # Get SSH access details first (fresh ones on retries, the IP may have changed)
+                ssh_details = self.get_access_details(refresh=attempt > 0)
                 
                 # Show EXACT command being sent to host
                 print(f"📡 Sending command to {ssh_details['username']}@{ssh_details['ipAddress']}:")
-                print("─" * 80)
-                print("COMMAND START:")
-                
-                # Format command display for better readability
-                if '\n' in command and len(command.split('\n')) > 3:
-                    # Multi-line command - show it formatted
-                    lines = command.split('\n')
-                    for i, line in enumerate(lines, 1):
-                        if line.strip():
-                            print(f"{i:2d}: {line}")
-                        else:
-                            print(f"{i:2d}:")
-                else:
-                    # Single line or short command
-                    print(command)
-                
-                print("COMMAND END:")
-                print("─" * 80)
+                self._display_command(command)
                 
                 # Log command to file on the instance
                 self._log_command_to_instance(ssh_details, command)
@@ -90,7 +104,7 @@ class LightsailBase:
                     ssh_cmd = self._build_ssh_command(key_path, cert_path, ssh_details, command)
                     
                     # Show full SSH command being executed
-                    if "GITHUB_ACTIONS" in os.environ:
+                    if IS_CI:
                         print(f"🔧 Full SSH Command:")
                         ssh_cmd_str = ' '.join([f'"{arg}"' if ' ' in arg else arg for arg in ssh_cmd])
                         print(f"   {ssh_cmd_str}")
@@ -129,7 +143,7 @@ class LightsailBase:
                             if attempt < max_retries - 1:
                                 print(f"   🔄 Connection issue detected, will retry...")
                                 # For GitHub Actions, try to restart instance on persistent failures
-                                if attempt >= 3 and "GITHUB_ACTIONS" in os.environ:
+                                if attempt >= 3 and IS_CI:
                                     print("   🔄 GitHub Actions detected - attempting instance restart...")
                                     self.restart_instance_for_connectivity()
                                 continue
@@ -159,6 +173,29 @@ class LightsailBase:
         
         return False, "Max retries exceeded"
 
+    def get_access_details(self, refresh=False):
+        """
+        Get SSH access details, reusing the last ones until shortly before they expire
+        
+        Lightsail's temporary certificate is valid for a while, so one
+        get_instance_access_details call can serve many commands.
+        
+        Args:
+            refresh (bool): Fetch new details even if the cached ones are valid
+            
+        Returns:
+            dict: accessDetails from get_instance_access_details
+        """
+        details = self._access_details
+        if not refresh and details:
+            expires_at = details.get('expiresAt')
+            if expires_at and expires_at - datetime.now(timezone.utc) > timedelta(seconds=60):
+                return details
+        
+        ssh_response = self.lightsail.get_instance_access_details(instanceName=self.instance_name)
+        self._access_details = ssh_response['accessDetails']
+        return self._access_details
+
     def create_ssh_files(self, ssh_details):
         """
         Create temporary SSH key files from Lightsail access details
@@ -203,8 +240,7 @@ class LightsailBase:
         try:
             print(f"📤 Copying {local_path} to {remote_path}")
             
-            ssh_response = self.lightsail.get_instance_access_details(instanceName=self.instance_name)
-            ssh_details = ssh_response['accessDetails']
+            ssh_details = self.get_access_details()
             
             key_path, cert_path = self.create_ssh_files(ssh_details)
             
@@ -212,7 +248,8 @@ class LightsailBase:
                 scp_cmd = [
                     'scp', '-i', key_path, '-o', f'CertificateFile={cert_path}',
                     '-o', 'StrictHostKeyChecking=no', '-o', 'UserKnownHostsFile=/dev/null',
-                    '-o', 'ConnectTimeout=30', '-o', 'IdentitiesOnly=yes',
+                    '-o', 'IdentitiesOnly=yes',
+                    *SSH_MULTIPLEX_OPTIONS,
                     local_path, f'{ssh_details["username"]}@{ssh_details["ipAddress"]}:{remote_path}'
                 ]
                 
@@ -234,6 +271,53 @@ class LightsailBase:
             print(f"   ❌ Error copying file: {str(e)}")
             return False
 
+    def stream_file_to_instance(self, local_path, remote_command, timeout=300):
+        """
+        Stream a local file into a remote command's stdin over one SSH session
+        
+        Avoids the scp + extract round trip: the file is never written to the
+        instance's disk as-is, e.g. a tarball piped straight into `tar -xz`.
+        
+        Args:
+            local_path (str): Local file path
+            remote_command (str): Command on the instance that reads stdin
+            timeout (int): Transfer timeout in seconds
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            print(f"📤 Streaming {local_path} to: {remote_command}")
+            
+            ssh_details = self.get_access_details()
+            
+            key_path, cert_path = self.create_ssh_files(ssh_details)
+            
+            try:
+                ssh_cmd = self._build_ssh_command(key_path, cert_path, ssh_details, remote_command,
+                                                  stdin_passthrough=True)
+                
+                # ssh reads the file descriptor directly, so there is no Python read loop to tune
+                with open(local_path, 'rb') as local_file:
+                    result = subprocess.run(ssh_cmd, stdin=local_file, capture_output=True,
+                                            text=True, timeout=timeout)
+                
+                if result.returncode == 0:
+                    print(f"   ✅ File streamed successfully")
+                    return True
+                else:
+                    print(f"   ❌ Failed to stream file (exit code: {result.returncode})")
+                    if result.stderr.strip():
+                        print(f"   Error: {result.stderr.strip()}")
+                    return False
+                
+            finally:
+                self._cleanup_ssh_files(key_path, cert_path)
+                
+        except Exception as e:
+            print(f"   ❌ Error streaming file: {str(e)}")
+            return False
+
     def get_instance_info(self):
         """
         Get instance information including public IP and state
@@ -256,23 +340,78 @@ class LightsailBase:
             print(f"❌ Error getting instance info: {e}")
             return None
 
-    def wait_for_instance_state(self, target_state='running', timeout=300):
+    def warm_instance_cache(self):
+        """
+        List every instance in the region once and cache this one's description
+        
+        Later get_instance_cached calls are then served from the listing
+        instead of one get_instance call each.
+        
+        Returns:
+            list: All instances from get_instances
+        """
+        instances = []
+        kwargs = {}
+        while True:
+            page = self.lightsail.get_instances(**kwargs)
+            instances.extend(page.get('instances', []))
+            if not page.get('nextPageToken'):
+                break
+            kwargs['pageToken'] = page['nextPageToken']
+        
+        for instance in instances:
+            if instance.get('name') == self.instance_name:
+                self._instance_cache = (time.monotonic(), {'instance': instance})
+                break
+        return instances
+
+    def get_instance_cached(self, ttl=INSTANCE_CACHE_TTL):
+        """
+        Get the instance description, reusing a response younger than ttl
+        
+        Args:
+            ttl (float): Seconds a get_instance response stays valid
+            
+        Returns:
+            dict: get_instance response
+        """
+        now = time.monotonic()
+        if self._instance_cache and now - self._instance_cache[0] < ttl:
+            return self._instance_cache[1]
+        
+        response = self.lightsail.get_instance(instanceName=self.instance_name)
+        self._instance_cache = (now, response)
+        return response
+
+    def invalidate_instance_cache(self):
+        """Forget the cached get_instance response, e.g. after waiting for a state change"""
+        self._instance_cache = None
+
+    def wait_for_instance_state(self, target_state='running', timeout=300, initial_delay=2.0, backoff=1.6, max_delay=20.0):
         """
         Wait for instance to reach target state
         
+        Polls quickly at first and backs off exponentially, so a state change
+        shortly after a check is noticed within seconds.
+        
         Args:
             target_state (str): Target instance state
             timeout (int): Maximum wait time in seconds
+            initial_delay (float): Seconds before the second check
+            backoff (float): Factor the delay grows by after each check
+            max_delay (float): Longest delay between checks
             
         Returns:
             bool: True if target state reached, False otherwise
         """
         print(f"⏳ Waiting for instance {self.instance_name} to be {target_state}...")
-        start_time = time.time()
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
         
-        while time.time() - start_time < timeout:
+        while True:
             try:
-                response = self.lightsail.get_instance(instanceName=self.instance_name)
+                self.invalidate_instance_cache()
+                response = self.get_instance_cached()
                 current_state = response['instance']['state']['name']
                 print(f"Instance state: {current_state}")
                 
@@ -282,11 +421,15 @@ class LightsailBase:
                 elif current_state in ['stopped', 'stopping', 'terminated'] and target_state == 'running':
                     print(f"❌ Instance is in {current_state} state")
                     return False
-                    
-                time.sleep(10)
             except ClientError as e:
                 print(f"❌ Error checking instance state: {e}")
                 return False
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(delay, remaining))
+            delay = min(max_delay, delay * backoff)
         
         print(f"❌ Timeout waiting for instance to be {target_state}")
         return False
@@ -305,7 +448,7 @@ class LightsailBase:
         print("🔍 Testing SSH connectivity...")
         
         # For GitHub Actions, use optimized retry strategy for faster deployments
-        if "GITHUB_ACTIONS" in os.environ:
+        if IS_CI:
             print("   🤖 GitHub Actions detected - using optimized retry strategy")
             # Reduce retries and timeout for faster deployment in CI
             max_retries = min(max_retries, 3)  # Maximum 3 retries in CI
@@ -318,7 +461,7 @@ class LightsailBase:
             print("❌ SSH connectivity failed")
             
             # In GitHub Actions, try one more time with instance restart
-            if "GITHUB_ACTIONS" in os.environ and not success:
+            if IS_CI and not success:
                 print("   🔄 GitHub Actions: Attempting instance restart as last resort...")
                 if self.restart_instance_for_connectivity():
                     print("   🔄 Retrying SSH after restart...")
@@ -333,8 +476,7 @@ class LightsailBase:
     def test_network_connectivity(self):
         """Test network connectivity to the instance"""
         try:
-            ssh_response = self.lightsail.get_instance_access_details(instanceName=self.instance_name)
-            ip_address = ssh_response['accessDetails']['ipAddress']
+            ip_address = self.get_access_details()['ipAddress']
             
             print(f"🔍 Testing network connectivity to {ip_address}...")
             
@@ -359,6 +501,8 @@ class LightsailBase:
         """Restart instance to resolve connectivity issues (GitHub Actions fallback)"""
         try:
             print("🔄 Attempting instance restart to resolve connectivity...")
+            self.invalidate_instance_cache()
+            self._access_details = None
             
             # Stop instance
             self.lightsail.stop_instance(instanceName=self.instance_name)
@@ -395,33 +539,34 @@ class LightsailBase:
             print(f"   ❌ Instance restart failed: {e}")
             return False
 
-    def _build_ssh_command(self, key_path, cert_path, ssh_details, command):
+    def _build_ssh_command(self, key_path, cert_path, ssh_details, command, stdin_passthrough=False):
         """Build SSH command with proper options and safe command encoding"""
-        import base64
-        
         # Encode the command to avoid shell parsing issues
         encoded_command = base64.b64encode(command.encode('utf-8')).decode('ascii')
-        safe_command = f"echo '{encoded_command}' | base64 -d | bash"
+        if stdin_passthrough:
+            # Keep the SSH channel as the command's stdin so local data can be piped in
+            safe_command = f"bash -c \"$(echo '{encoded_command}' | base64 -d)\""
+        else:
+            safe_command = f"echo '{encoded_command}' | base64 -d | bash"
         
         # Enhanced SSH configuration for GitHub Actions compatibility
-        if "GITHUB_ACTIONS" in os.environ:
+        if IS_CI:
             return [
                 'ssh', '-i', key_path, '-o', f'CertificateFile={cert_path}',
                 '-o', 'StrictHostKeyChecking=no', '-o', 'UserKnownHostsFile=/dev/null',
-                '-o', 'ConnectTimeout=60', '-o', 'ServerAliveInterval=30',
-                '-o', 'ServerAliveCountMax=6', '-o', 'ConnectionAttempts=3',
-                '-o', 'IdentitiesOnly=yes', '-o', 'TCPKeepAlive=yes',
+                '-o', 'ConnectionAttempts=3', '-o', 'IdentitiesOnly=yes',
                 '-o', 'ExitOnForwardFailure=yes', '-o', 'BatchMode=yes',
                 '-o', 'PreferredAuthentications=publickey', '-o', 'LogLevel=VERBOSE',
+                *SSH_MULTIPLEX_OPTIONS,
                 f'{ssh_details["username"]}@{ssh_details["ipAddress"]}', safe_command
             ]
         else:
             return [
                 'ssh', '-i', key_path, '-o', f'CertificateFile={cert_path}',
                 '-o', 'StrictHostKeyChecking=no', '-o', 'UserKnownHostsFile=/dev/null',
-                '-o', 'ConnectTimeout=30', '-o', 'ServerAliveInterval=10',
-                '-o', 'ServerAliveCountMax=3', '-o', 'IdentitiesOnly=yes',
+                '-o', 'IdentitiesOnly=yes',
                 '-o', 'BatchMode=yes', '-o', 'LogLevel=ERROR',
+                *SSH_MULTIPLEX_OPTIONS,
                 f'{ssh_details["username"]}@{ssh_details["ipAddress"]}', safe_command
             ]
 
@@ -446,15 +591,86 @@ class LightsailBase:
     
     def run_command_with_live_output(self, command, timeout=300):
         """
-        Execute command with live output streaming - shows each command as it executes
+        Execute command in a single SSH session, printing output as it arrives
+        
+        stdout and stderr are merged and echoed line by line. Only the last
+        LIVE_OUTPUT_TAIL_LINES lines are kept, so long installs don't buffer
+        their whole log in memory.
+        
+        Args:
+            command (str): Command to execute
+            timeout (int): Command timeout in seconds
+            
+        Returns:
+            tuple: (success: bool, output: str) where output is the retained tail
         """
         print(f"🔧 Executing with live output on {self.instance_name}:")
         
-        # Break down complex scripts into individual commands
-        if 'set -e' in command and '\n' in command:
-            return self._run_script_with_individual_commands(command, timeout)
+        try:
+            ssh_details = self.get_access_details()
+            
+            print(f"📡 Sending command to {ssh_details['username']}@{ssh_details['ipAddress']}:")
+            self._display_command(command)
+            self._log_command_to_instance(ssh_details, command)
+            
+            key_path, cert_path = self.create_ssh_files(ssh_details)
+            try:
+                ssh_cmd = self._build_ssh_command(key_path, cert_path, ssh_details, command)
+                process = subprocess.Popen(ssh_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                           text=True, bufsize=1)
+                
+                # Reading blocks until the next line, so the timeout kills the session instead
+                started = time.monotonic()
+                timer = threading.Timer(timeout, process.kill)
+                timer.start()
+                tail = collections.deque(maxlen=LIVE_OUTPUT_TAIL_LINES)
+                try:
+                    for line in process.stdout:
+                        line = line.rstrip('\n')
+                        print(f"   {line}")
+                        tail.append(line)
+                    returncode = process.wait()
+                finally:
+                    timer.cancel()
+                    process.stdout.close()
+            finally:
+                self._cleanup_ssh_files(key_path, cert_path)
+            
+            print("─" * 80)
+            if returncode != 0 and time.monotonic() - started >= timeout:
+                print(f"   ⏰ Command timed out after {timeout} seconds")
+                return False, f"Command timed out after {timeout} seconds"
+            
+            output = '\n'.join(tail).strip()
+            if returncode == 0:
+                print(f"✅ SUCCESS (exit code: 0)")
+                return True, output
+            print(f"❌ FAILED (exit code: {returncode})")
+            return False, output
+        except Exception as e:
+            print(f"   ❌ Error: {str(e)}")
+            return False, str(e)
+    
+    def _display_command(self, command):
+        """Print the exact command being sent to the instance"""
+        print("─" * 80)
+        print("COMMAND START:")
+        
+        # Format command display for better readability
+        if '\n' in command and len(command.split('\n')) > 3:
+            # Multi-line command - show it formatted
+            lines = command.split('\n')
+            for i, line in enumerate(lines, 1):
+                if line.strip():
+                    print(f"{i:2d}: {line}")
+                else:
+                    print(f"{i:2d}:")
         else:
-            return self.run_command(command, timeout, verbose=True)
+            # Single line or short command
+            print(command)
+        
+        print("COMMAND END:")
+        print("─" * 80)
 
     def _is_connection_error(self, error_msg):
         """Check if error message indicates a connection issue"""
@@ -471,7 +687,7 @@ class LightsailBase:
         """Log command to a file on the Lightsail instance for tracking"""
         try:
             # Show that we're logging (only in GitHub Actions for visibility)
-            if "GITHUB_ACTIONS" in os.environ:
+            if IS_CI:
                 print(f"📝 Logging detailed commands to instance log file...")
             
             # Create log entry with timestamp
@@ -504,8 +720,7 @@ class LightsailBase:
                     description = "Multi-line script"
                 
                 # Log script header
-                script_header = f"[{timestamp}] SCRIPT_START: {description}"
-                self._write_log_entry(ssh_details, script_header)
+                entries = [f"[{timestamp}] SCRIPT_START: {description}"]
                 
                 # Log each individual command
                 command_num = 1
@@ -514,32 +729,32 @@ class LightsailBase:
                     if line_stripped and not line_stripped.startswith('#'):
                         if line_stripped != 'set -e':  # Skip error handling directive
                             individual_timestamp = time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime())
-                            log_entry = f"[{individual_timestamp}] CMD_{command_num:02d}: {line_stripped}"
-                            self._write_log_entry(ssh_details, log_entry)
+                            entries.append(f"[{individual_timestamp}] CMD_{command_num:02d}: {line_stripped}")
                             command_num += 1
                 
                 # Log script end
                 end_timestamp = time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime())
-                script_end = f"[{end_timestamp}] SCRIPT_END: {description} (executed {command_num-1} commands)"
-                self._write_log_entry(ssh_details, script_end)
+                entries.append(f"[{end_timestamp}] SCRIPT_END: {description} (executed {command_num-1} commands)")
                 
             else:
                 # Single line command
-                log_entry = f"[{timestamp}] COMMAND: {command}"
-                self._write_log_entry(ssh_details, log_entry)
+                entries = [f"[{timestamp}] COMMAND: {command}"]
+            
+            # All entries go out in one SSH call instead of one per line
+            self._write_log_entry(ssh_details, '\n'.join(entries))
                 
         except Exception as e:
             # Show logging errors in GitHub Actions for debugging
-            if "GITHUB_ACTIONS" in os.environ:
+            if IS_CI:
                 print(f"   ⚠️ Logging exception: {str(e)}")
             pass
 
     def _write_log_entry(self, ssh_details, log_entry):
-        """Write a single log entry to the instance log file"""
+        """Append one or more newline-separated log entries to the instance log file"""
         try:
-            # Escape single quotes in the log entry
+            # Escape single quotes in the log entry; printf keeps embedded newlines and backslashes as-is
             escaped_log_entry = log_entry.replace("'", "'\"'\"'")
-            log_command = f"sudo mkdir -p /var/log && echo '{escaped_log_entry}' | sudo tee -a /var/log/deployment-commands.log > /dev/null"
+            log_command = f"sudo mkdir -p /var/log && printf '%s\\n' '{escaped_log_entry}' | sudo tee -a /var/log/deployment-commands.log > /dev/null"
             
             # Create temporary SSH key files for logging
             key_path, cert_path = self.create_ssh_files(ssh_details)
@@ -549,12 +764,15 @@ class LightsailBase:
                 ssh_cmd = [
                     'ssh', '-i', key_path, '-o', f'CertificateFile={cert_path}',
                     '-o', 'StrictHostKeyChecking=no', '-o', 'UserKnownHostsFile=/dev/null',
-                    '-o', 'ConnectTimeout=10', '-o', 'BatchMode=yes', '-o', 'LogLevel=ERROR',
+                    '-o', 'BatchMode=yes', '-o', 'LogLevel=ERROR',
+                    *SSH_MULTIPLEX_OPTIONS,
                     f'{ssh_details["username"]}@{ssh_details["ipAddress"]}', log_command
                 ]
                 
-                # Execute logging command
-                result = subprocess.run(ssh_cmd, capture_output=True, text=True, timeout=15)
+                # Execute logging command; this call usually opens the shared master
+                # connection, so allow for the full ConnectTimeout
+                result = subprocess.run(ssh_cmd, capture_output=True, text=True,
+                                        timeout=75 if IS_CI else 45)
                 
             finally:
                 self._cleanup_ssh_files(key_path, cert_path)
@@ -628,111 +846,6 @@ class LightsailBase:
                 os.unlink(cert_path)
         except Exception:
             pass  # Ignore cleanup errors
-    
-    def _run_script_with_individual_commands(self, script, timeout=300):
-        """
-        Run a bash script by executing individual commands and showing each one
-        """
-        print("📋 Breaking down script into individual commands:")
-        
-        # Parse the script into individual commands
-        lines = script.split('\n')
-        commands = []
-        current_command = []
-        in_heredoc = False
-        heredoc_delimiter = None
-        
-        for line in lines:
-            stripped = line.strip()
-            
-            # Skip empty lines and comments at the start
-            if not stripped or stripped.startswith('#'):
-                if current_command:  # Only add if we're building a command
-                    current_command.append(line)
-                continue
-            
-            # Skip 'set -e' as it's just error handling
-            if stripped == 'set -e':
-                continue
-            
-            # Handle heredoc start
-            if '<<' in line and not in_heredoc:
-                heredoc_delimiter = line.split('<<')[-1].strip().strip("'\"")
-                current_command.append(line)
-                in_heredoc = True
-                continue
-            
-            # Handle heredoc end
-            if in_heredoc:
-                current_command.append(line)
-                if stripped == heredoc_delimiter or stripped.endswith(heredoc_delimiter):
-                    in_heredoc = False
-                    heredoc_delimiter = None
-                continue
-            
-            # Handle line continuations
-            if line.endswith('\\'):
-                current_command.append(line)
-                continue
-            
-            # Add current line to command
-            current_command.append(line)
-            
-            # If this looks like a complete command, save it
-            if (stripped.endswith(';') or 
-                not stripped.endswith('\\') and 
-                not stripped.endswith('|') and
-                not stripped.endswith('&&') and
-                not stripped.endswith('||')):
-                
-                if current_command:
-                    cmd_text = '\n'.join(current_command).strip()
-                    if cmd_text and not cmd_text.startswith('#'):
-                        commands.append(cmd_text)
-                current_command = []
-        
-        # Add any remaining command
-        if current_command:
-            cmd_text = '\n'.join(current_command).strip()
-            if cmd_text and not cmd_text.startswith('#'):
-                commands.append(cmd_text)
-        
-        print(f"   📊 Found {len(commands)} individual commands to execute")
-        
-        # Execute each command individually
-        all_output = []
-        for i, cmd in enumerate(commands, 1):
-            print(f"\n🔸 Step {i}/{len(commands)}: Executing individual command")
-            
-            # Show the command being executed
-            cmd_lines = cmd.split('\n')
-            print(f"📋 Command to execute:")
-            for j, cmd_line in enumerate(cmd_lines):
-                if cmd_line.strip():
-                    print(f"   {j+1}: {cmd_line.strip()}")
-            
-            # Execute the command
-            print(f"🚀 Sending to Lightsail host...")
-            success, output = self.run_command(cmd, timeout=60, verbose=False)
-            
-            if success:
-                print(f"      ✅ Command {i} completed successfully")
-                if output.strip():
-                    # Show key output lines
-                    output_lines = output.split('\n')
-                    for line in output_lines[:10]:  # Show first 10 lines
-                        if line.strip():
-                            print(f"         {line}")
-                    if len(output_lines) > 10:
-                        print(f"         ... ({len(output_lines)-10} more lines)")
-                all_output.append(output)
-            else:
-                print(f"      ❌ Command {i} failed")
-                if output:
-                    print(f"         Error: {output}")
-                return False, f"Command {i} failed: {output}"
-        
-        return True, '\n'.join(all_output)
 
 
 class LightsailSSHManager(LightsailBase):
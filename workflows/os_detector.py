@@ -5,6 +5,7 @@ Detects the operating system and package manager from blueprint information
 """
 
 import re
+import functools
 from typing import Tuple, Dict, Any
 
 class OSDetector:
@@ -81,6 +82,13 @@ class OSDetector:
         Returns:
             Dictionary of command templates
         """
+        # Return a copy so callers can't mutate the cached table
+        return dict(cls._package_manager_commands(package_manager))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _package_manager_commands(package_manager: str) -> Dict[str, str]:
+        """Build (and cache) the command table for a package manager"""
         if package_manager == 'apt':
             return {
                 'update': 'sudo apt-get update -qq',
@@ -105,7 +113,7 @@ class OSDetector:
             }
         else:
             # Fallback to apt commands
-            return cls.get_package_manager_commands('apt')
+            return OSDetector._package_manager_commands('apt')
     
     @classmethod
     def get_service_commands(cls, service_manager: str) -> Dict[str, str]:
@@ -118,20 +126,28 @@ class OSDetector:
         Returns:
             Dictionary of service command templates
         """
+        return dict(cls._service_commands(service_manager))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _service_commands(service_manager: str) -> Dict[str, str]:
+        """Build (and cache) the command table for a service manager"""
         if service_manager == 'systemd':
             return {
                 'start': 'sudo systemctl start',
                 'stop': 'sudo systemctl stop',
                 'restart': 'sudo systemctl restart',
                 'enable': 'sudo systemctl enable',
+                'enable_now': 'sudo systemctl enable --now',
                 'disable': 'sudo systemctl disable',
                 'status': 'sudo systemctl status',
                 'is_active': 'systemctl is-active --quiet',
-                'reload': 'sudo systemctl daemon-reload'
+                'reload': 'sudo systemctl daemon-reload',
+                'reload_or_restart': 'sudo systemctl reload-or-restart'
             }
         else:
             # Fallback to systemd commands (most modern systems use systemd)
-            return cls.get_service_commands('systemd')
+            return OSDetector._service_commands('systemd')
     
     @classmethod
     def get_os_specific_packages(cls, os_type: str, package_manager: str) -> Dict[str, Dict[str, str]]:
@@ -145,6 +161,17 @@ class OSDetector:
         Returns:
             Dictionary mapping generic package names to OS-specific package names
         """
+        # The table only depends on the package manager; copy the cached
+        # entries so callers can't alter the shared package lists
+        return {
+            name: {'packages': list(entry['packages']), 'service': entry['service']}
+            for name, entry in cls._os_specific_packages(package_manager).items()
+        }
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _os_specific_packages(package_manager: str) -> Dict[str, Dict[str, Any]]:
+        """Look up (and cache) the package table for a package manager"""
         if package_manager == 'apt':
             return {
                 'apache': {'packages': ['apache2'], 'service': 'apache2'},
@@ -183,7 +210,7 @@ class OSDetector:
             }
         else:
             # Fallback to apt packages
-            return cls.get_os_specific_packages('ubuntu', 'apt')
+            return OSDetector._os_specific_packages('apt')
 
     @classmethod
     def get_user_info(cls, os_type: str) -> Dict[str, str]:
@@ -196,6 +223,14 @@ class OSDetector:
         Returns:
             Dictionary with user information
         """
+        # Callers often extend this dict (package_manager, service_manager),
+        # so hand out a copy of the cached entry
+        return dict(cls._user_info(os_type))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _user_info(os_type: str) -> Dict[str, str]:
+        """Look up (and cache) the user table for an OS type"""
         user_configs = {
             'ubuntu': {
                 'default_user': 'ubuntu',
@@ -10,6 +10,7 @@ import sys
 import boto3
 import time
 from os_detector import OSDetector
+from config_loader import YamlLoader
 
 def main():
     """Main setup function with full functionality from embedded script"""
@@ -23,7 +24,7 @@ def main():
         
         # Load configuration
         with open(config_file, 'r') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YamlLoader)
         
         # Extract values from config (allow input overrides)
         instance_name = instance_name_override or config['lightsail']['instance_name']